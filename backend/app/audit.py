@@ -0,0 +1,285 @@
+# backend/app/audit.py
+import os
+import json
+import math
+import time
+import fcntl
+import queue
+import datetime
+import threading
+from pathlib import Path
+
+# Rotate the active segment when it exceeds this size or the day changes
+AUDIT_MAX_BYTES = int(os.environ.get("SIGSECURE_AUDIT_MAX_MB", 10)) * 1024 * 1024
+# One sparse index entry (byte offset + timestamp) per this many bytes of log
+INDEX_BLOCK = 64 * 1024
+FLUSH_INTERVAL = 0.2  # Seconds the writer waits to batch entries
+FLUSH_BATCH = 256  # Max entries per write
+
+
+def _parse_time(value, end=False):
+    # ISO timestamps or dates -> epoch seconds (None passes through). end=True gives the
+    # exclusive upper bound of an inclusive range: the next midnight for a date-only
+    # value (the whole day counts), just past the instant for a timestamp.
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        ts = float(value)
+    elif end and len(value) == 10:
+        day = datetime.date.fromisoformat(value) + datetime.timedelta(days=1)
+        return datetime.datetime.combine(day, datetime.time()).timestamp()
+    else:
+        ts = datetime.datetime.fromisoformat(value).timestamp()
+    return math.nextafter(ts, math.inf) if end else ts
+
+
+class AuditStore:
+    """
+    Append-only audit log split into rotated JSON-lines segments under one directory.
+    - Writes are queued and appended in batches by a single writer thread per process;
+      an flock on a lock file serialises appends and rotation across gunicorn workers.
+    - Each segment has a sparse .idx sidecar (offset, timestamp every INDEX_BLOCK bytes)
+      so date-range reads seek instead of scanning from the start.
+    - Cursors are "<segment>:<byte offset>", so pagination never re-reads earlier pages.
+    """
+
+    def __init__(self, directory, legacy_file=None, max_bytes=AUDIT_MAX_BYTES):
+        self.dir = Path(directory)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock_path = self.dir / ".lock"
+        self._queue = queue.Queue()
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._flushed = threading.Condition()
+        self._pending = 0
+        if legacy_file is not None:
+            self._import_legacy(Path(legacy_file))
+
+    # --- writing -------------------------------------------------------------
+
+    def _locked(self):
+        lock_file = open(self._lock_path, "a")
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return lock_file
+
+    def _import_legacy(self, legacy_file):
+        # The old single audit_log.json becomes the oldest segment
+        if not legacy_file.exists():
+            return
+        with self._locked():
+            if legacy_file.exists() and legacy_file.stat().st_size > 0:
+                target = self.dir / "audit-00000000-000000-000000.jsonl"
+                os.replace(legacy_file, target)
+                self._rebuild_index(target)
+            elif legacy_file.exists():
+                legacy_file.unlink()
+
+    def _ensure_writer(self):
+        # Started lazily per process: threads do not survive a preload fork
+        if self._pid != os.getpid():
+            with self._start_lock:
+                if self._pid != os.getpid():
+                    threading.Thread(target=self._writer, name="audit-writer", daemon=True).start()
+                    self._pid = os.getpid()
+
+    def write(self, entry):
+        """Queues one audit entry (dict) for the writer thread."""
+        self._ensure_writer()
+        with self._flushed:
+            self._pending += 1
+        self._queue.put(entry)
+
+    def flush(self, timeout=5.0):
+        """Blocks until every entry queued by this process has been written."""
+        deadline = time.monotonic() + timeout
+        with self._flushed:
+            while self._pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._flushed.wait(remaining)
+
+    def _writer(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while len(batch) < FLUSH_BATCH:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._append(batch)
+            except Exception as e:
+                print(f"Failed to write {len(batch)} audit entries: {e}")
+            finally:
+                with self._flushed:
+                    self._pending -= len(batch)
+                    self._flushed.notify_all()
+
+    def _segments(self):
+        return sorted(self.dir.glob("audit-*.jsonl"))
+
+    def _active_segment(self, now):
+        segments = self._segments()
+        if segments:
+            active = segments[-1]
+            same_day = active.name[6:14] == now.strftime("%Y%m%d")
+            if same_day and active.stat().st_size < self.max_bytes:
+                return active
+        return self.dir / f"audit-{now.strftime('%Y%m%d-%H%M%S-%f')}.jsonl"
+
+    def _append(self, batch):
+        lines = "".join(json.dumps(entry) + "\n" for entry in batch).encode("utf-8")
+        with self._locked():
+            segment = self._active_segment(datetime.datetime.now())
+            with open(segment, "ab") as f:
+                offset = f.tell()
+                f.write(lines)
+            self._index(segment, offset, batch[0].get("timestamp"))
+
+    def _index(self, segment, offset, timestamp):
+        # Add an index entry when this write starts a new INDEX_BLOCK of the segment
+        idx_path = segment.with_suffix(".idx")
+        last_block = -1
+        if idx_path.exists():
+            with open(idx_path, "rb") as f:
+                f.seek(max(0, idx_path.stat().st_size - 64))
+                tail = f.read().decode().strip().splitlines()
+                if tail:
+                    last_block = int(tail[-1].split("\t")[0]) // INDEX_BLOCK
+        if offset // INDEX_BLOCK > last_block:
+            with open(idx_path, "a") as f:
+                f.write(f"{offset}\t{_parse_time(timestamp) or time.time()}\n")
+
+    def _rebuild_index(self, segment):
+        with open(segment, "rb") as f, open(segment.with_suffix(".idx"), "w") as idx:
+            last_block = -1
+            offset = 0
+            for line in f:
+                if offset // INDEX_BLOCK > last_block:
+                    try:
+                        ts = _parse_time(json.loads(line).get("timestamp"))
+                    except ValueError:
+                        ts = None
+                    if ts is not None:
+                        idx.write(f"{offset}\t{ts}\n")
+                        last_block = offset // INDEX_BLOCK
+                offset += len(line)
+
+    def clear(self):
+        self.flush()
+        with self._locked():
+            for path in list(self.dir.glob("audit-*")):
+                path.unlink()
+
+    # --- reading -------------------------------------------------------------
+
+    def _seek_offset(self, segment, start_ts):
+        # Largest indexed offset whose timestamp is still before start_ts
+        idx_path = segment.with_suffix(".idx")
+        best = 0
+        if start_ts is None or not idx_path.exists():
+            return best
+        with open(idx_path) as f:
+            for line in f:
+                offset, ts = line.split("\t")
+                if float(ts) < start_ts:
+                    best = int(offset)
+                else:
+                    break
+        return best
+
+    def _scan(self, segment, offset, start_ts, end_ts, file, errors_only):
+        # Yields (entry, next_offset) for matching lines of one segment, from offset
+        with open(segment, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                offset += len(line)
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Partially written line
+                if start_ts is not None or end_ts is not None:
+                    ts = _parse_time(entry.get("timestamp"))
+                    if start_ts is not None and (ts is None or ts < start_ts):
+                        continue
+                    if end_ts is not None and ts is not None and ts >= end_ts:
+                        # Not return: workers stamp batches before waiting for the lock,
+                        # so a segment is only roughly in time order
+                        continue
+                if file and file.lower() not in str(entry.get("file", "")).lower():
+                    continue
+                if errors_only and not entry.get("error"):
+                    continue
+                yield entry, offset
+
+    def _segment_start(self, segment):
+        # Timestamp of the segment's first indexed entry (None if unknown)
+        idx_path = segment.with_suffix(".idx")
+        if not idx_path.exists():
+            return None
+        with open(idx_path) as f:
+            first = f.readline()
+        return float(first.split("\t")[1]) if first else None
+
+    def iter_entries(self, cursor=None, start=None, end=None, file=None, errors_only=False):
+        """
+        Yields (entry, cursor_after_entry) in write order, applying the filters.
+        - start/end: ISO dates or timestamps (inclusive range on the entry timestamp).
+        - file: case-insensitive substring match on the entry's file name.
+        """
+        start_ts, end_ts = _parse_time(start), _parse_time(end, end=True)
+        segments = self._segments()
+        first_segment, first_offset = None, 0
+        if cursor:
+            first_segment, _, offset = cursor.rpartition(":")
+            first_offset = int(offset)
+        for i, segment in enumerate(segments):
+            if first_segment and segment.name < first_segment:
+                continue
+            segment_start = self._segment_start(segment)
+            if end_ts is not None and segment_start is not None and segment_start >= end_ts:
+                return  # Later segments start later still
+            # Skip segments that were rotated out before the range starts
+            if start_ts is not None and i + 1 < len(segments):
+                next_start = self._segment_start(segments[i + 1])
+                if next_start is not None and next_start < start_ts:
+                    continue
+            if segment.name == first_segment:
+                offset = first_offset
+            else:
+                offset = self._seek_offset(segment, start_ts)
+            for entry, after in self._scan(segment, offset, start_ts, end_ts, file, errors_only):
+                yield entry, f"{segment.name}:{after}"
+
+    def page(self, limit, cursor=None, **filters):
+        """Up to limit entries after cursor, plus the cursor for the next page (None at the end)."""
+        entries = []
+        next_cursor = None
+        for entry, after in self.iter_entries(cursor=cursor, **filters):
+            if len(entries) == limit:
+                next_cursor = last
+                break
+            entries.append(entry)
+            last = after
+        return entries, next_cursor
+
+    def tail(self, n, start=None, end=None, file=None, errors_only=False):
+        """The last n matching entries (oldest first), reading the newest segments first."""
+        start_ts, end_ts = _parse_time(start), _parse_time(end, end=True)
+        found = []
+        for segment in reversed(self._segments()):
+            if len(found) >= n:
+                break
+            segment_start = self._segment_start(segment)
+            if end_ts is not None and segment_start is not None and segment_start >= end_ts:
+                continue  # Starts after the range; older segments may still match
+            offset = self._seek_offset(segment, start_ts)
+            matches = [entry for entry, _ in self._scan(segment, offset, start_ts, end_ts, file, errors_only)]
+            found = matches[-(n - len(found)):] + found
+        return found
@@ -0,0 +1,136 @@
+# backend/app/jobs.py
+import os
+import queue
+import threading
+import time
+import uuid
+import datetime
+from pathlib import Path
+
+# Bounded in-process job queue. Job state lives in this process, so run gunicorn
+# with a single worker process and threads (e.g. --workers 1 --threads 8).
+JOB_WORKERS = int(os.environ.get("SIGSECURE_JOB_WORKERS", 2))
+JOB_QUEUE_SIZE = int(os.environ.get("SIGSECURE_JOB_QUEUE_SIZE", 16))
+JOB_TTL_SECONDS = int(os.environ.get("SIGSECURE_JOB_TTL", 3600))
+EXPIRE_INTERVAL = 60  # Seconds an idle worker waits before sweeping expired jobs
+
+
+class QueueFull(Exception):
+    """Raised by JobQueue.submit when the backlog is at capacity (backpressure)."""
+
+
+class JobQueue:
+    """
+    Runs handler(job) on a fixed pool of daemon threads.
+    - submit() returns immediately with a job dict, or raises QueueFull.
+    - Jobs move queued -> running -> done | failed; handler returns a dict merged into the job.
+    - Finished jobs (and their result files) expire after JOB_TTL_SECONDS; expired jobs
+      are swept on submit() and get(), and by idle workers every EXPIRE_INTERVAL.
+    """
+
+    def __init__(self, handler, workers=JOB_WORKERS, max_pending=JOB_QUEUE_SIZE, ttl=JOB_TTL_SECONDS):
+        self.handler = handler
+        self.ttl = ttl
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._workers = workers
+        self._threads = []
+        self._pid = None
+
+    def _ensure_started(self):
+        # Threads start on first use, in the process that serves requests: with
+        # gunicorn preload_app the module is imported in the master, and threads
+        # do not survive the fork into workers.
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._threads = [
+                        threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+                        for i in range(self._workers)
+                    ]
+                    for thread in self._threads:
+                        thread.start()
+                    self._pid = os.getpid()
+
+    def submit(self, **params):
+        self._ensure_started()
+        self._expire()
+        job = {
+            "id": uuid.uuid4().hex,
+            "status": "queued",
+            "created": datetime.datetime.now().isoformat(),
+            "started": None,
+            "finished": None,
+            "error": None,
+            "params": params,
+        }
+        with self._lock:
+            self._jobs[job["id"]] = job
+        try:
+            self._queue.put_nowait(job["id"])
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job["id"]]
+            raise QueueFull(f"Job queue is full ({self._queue.maxsize} pending)")
+        return job
+
+    def get(self, job_id):
+        self._expire()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _worker(self):
+        while True:
+            try:
+                job_id = self._queue.get(timeout=max(1, min(EXPIRE_INTERVAL, self.ttl)))
+            except queue.Empty:
+                self._expire()  # Idle: result files go even when nobody submits or polls
+                continue
+            try:
+                self._run(job_id)
+            finally:
+                self._queue.task_done()  # Every get() is matched, even for a vanished job
+
+    def _run(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job["status"] = "running"
+            job["started"] = datetime.datetime.now().isoformat()
+        try:
+            result = self.handler(job) or {}
+            with self._lock:
+                job.update(result)
+                job["status"] = "done"
+        except Exception as e:
+            with self._lock:
+                job["status"] = "failed"
+                job["error"] = str(e)
+        finally:
+            with self._lock:
+                job["finished"] = datetime.datetime.now().isoformat()
+                job["finished_at"] = time.time()
+
+    def _expire(self):
+        # Drop finished jobs past their TTL and delete their output files
+        now = time.time()
+        with self._lock:
+            expired = [
+                job for job in self._jobs.values()
+                if job.get("finished_at") and now - job["finished_at"] > self.ttl
+            ]
+            for job in expired:
+                del self._jobs[job["id"]]
+        for job in expired:
+            result_path = job.get("result_path")
+            if result_path:
+                try:
+                    Path(result_path).unlink()
+                except FileNotFoundError:
+                    pass
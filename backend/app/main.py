@@ -1,18 +1,33 @@
+import io
+import base64
 import sys
+import time
+import cProfile
 from pathlib import Path
 import os
 import json
 import datetime
 import traceback
-from flask import Flask, jsonify, request, send_file
+import shutil
+import tempfile
+import zipfile
+import uuid
+from flask import Flask, Response, g, jsonify, request, send_file, stream_with_context
 from flask_cors import CORS
 from dotenv import load_dotenv
 from werkzeug.utils import secure_filename
 
 # Import local modules
 sys.path.append(str(Path(__file__).resolve().parent.parent))  # Add backend/ to path
-from models.signature_detect import detect_signatures
+from models.document_session import DocumentSession
+from models.pipeline import analyze_document, analyze_documents, stream_document
 from models.text_pipeline import detect_and_redact_text_near_signatures
+from models import registry, metrics, inference
+from models.semantic import anchor_key, embedding_cache
+from models.page_filter import screening_report
+from models.result_cache import ResultCache, file_digest, bytes_digest
+from app.jobs import JobQueue, QueueFull
+from app.audit import AuditStore, _parse_time
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -28,65 +43,234 @@ OUTPUT_FOLDER = UPLOAD_FOLDER / "redacted"
 UPLOAD_FOLDER.mkdir(exist_ok=True)
 OUTPUT_FOLDER.mkdir(exist_ok=True)
 
+# Processed PDFs up to this size are returned from memory, larger ones via a temp file
+OUTPUT_SPOOL_BYTES = int(os.environ.get("SIGSECURE_OUTPUT_SPOOL_MB", 32)) * 1024 * 1024
+
+# Batch uploads: max PDFs per request, max size of one PDF and of all PDFs together
+# (zip members are checked by their uncompressed size before they are extracted)
+BATCH_MAX_FILES = int(os.environ.get("SIGSECURE_BATCH_MAX_FILES", 100))
+BATCH_MAX_FILE_BYTES = int(os.environ.get("SIGSECURE_BATCH_MAX_FILE_MB", 50)) * 1024 * 1024
+BATCH_MAX_TOTAL_BYTES = int(os.environ.get("SIGSECURE_BATCH_MAX_MB", 500)) * 1024 * 1024
+
+# Content-hash result cache (SIGSECURE_CACHE=0 disables it)
+CACHE_ENABLED = os.environ.get("SIGSECURE_CACHE", "1") != "0"
+CACHE_FOLDER = Path(os.environ.get("SIGSECURE_CACHE_DIR", UPLOAD_FOLDER / "cache"))
+CACHE_MAX_BYTES = int(os.environ.get("SIGSECURE_CACHE_MAX_MB", 512)) * 1024 * 1024
+result_cache = ResultCache(CACHE_FOLDER, CACHE_MAX_BYTES) if CACHE_ENABLED else None
+
+# Rotated, indexed audit log (the old data/audit_log.json is imported on first start)
+audit_store = AuditStore(UPLOAD_FOLDER / "audit", legacy_file=UPLOAD_FOLDER / "audit_log.json")
+AUDIT_PAGE_MAX = 1000  # Max entries per /api/audit_log page
+
 app.config["UPLOAD_FOLDER"] = UPLOAD_FOLDER
+
+# Load models at import instead of on the first request. With gunicorn preload_app
+# (see gunicorn.conf.py) this runs once in the master and workers share the weights.
+if os.environ.get("SIGSECURE_PRELOAD", "0") == "1":
+    registry.warm_up()
 app.config["DEBUG"] = False
 
+# Optional cProfile dump per request (one .prof file each) for finding hot spots
+PROFILE_DIR = os.environ.get("SIGSECURE_PROFILE_DIR")
+
+
+@app.before_request
+def start_request_trace():
+    # Spans recorded anywhere in this request (and its pool workers) land in g.trace
+    g.started = time.perf_counter()
+    g.trace, g.trace_token = metrics.start_trace()
+    g.profiler = None
+    if PROFILE_DIR and request.endpoint not in ("metrics_endpoint", "health_check"):
+        g.profiler = cProfile.Profile()
+        g.profiler.enable()
+
+
+@app.after_request
+def observe_request(response):
+    endpoint = request.endpoint or "unknown"
+    metrics.request_seconds.observe(endpoint, time.perf_counter() - g.get("started", time.perf_counter()))
+    metrics.requests_total.inc(endpoint, str(response.status_code))
+    return response
+
+
+@app.teardown_request
+def end_request_trace(exc):
+    # Popped: streamed responses (stream_with_context) run teardown a second time
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        profiler.disable()
+        Path(PROFILE_DIR).mkdir(parents=True, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        profiler.dump_stats(str(Path(PROFILE_DIR) / f"{stamp}_{request.endpoint}.prof"))
+    token = g.pop("trace_token", None)
+    if token is not None:
+        metrics.end_trace(token)
+
+
+@app.route("/api/metrics", methods=["GET"])
+def metrics_endpoint():
+    """Stage and request histograms in Prometheus text format (per process)."""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
 
 @app.route("/api/health", methods=["GET"])
 def health_check():
-    return jsonify({"status": "Backend is running"})
+    return jsonify({
+        "status": "Backend is running",
+        "models_loaded": registry.loaded(),
+        "model_load_seconds": registry.load_seconds,
+        "bert_backend": registry.BERT_BACKEND,
+        "bert_threads": registry.BERT_THREADS,
+        "embedding_cache": embedding_cache.stats(),
+        "inference": inference.stats(),
+    })
 
 
-@app.route("/api/upload", methods=["POST"])
-def upload_file():
-    try:
-        if "file" not in request.files:
-            return jsonify({"error": "No file selected"}), 400
+def read_settings(form):
+    return {
+        "privacy_mode": form.get("privacy_mode", "none"),
+        "redaction_style": form.get("redaction_style", "black"),
+        "highlight_only": form.get("highlight_only", "false").lower() == "true",
+    }
 
-        file = request.files["file"]
-        if file.filename == "":
-            return jsonify({"error": "No file selected"}), 400
-        if not file.filename.endswith(".pdf"):
-            return jsonify({"error": "Only PDF files are supported"}), 400
 
-        # Settings
-        privacy_mode = request.form.get("privacy_mode", "none")
-        redaction_style = request.form.get("redaction_style", "black")
-        highlight_only = request.form.get("highlight_only", "false").lower() == "true"
+def validate_upload(files):
+    """Returns (file, None) or (None, error response)."""
+    if "file" not in files:
+        return None, (jsonify({"error": "No file selected"}), 400)
+    file = files["file"]
+    if file.filename == "":
+        return None, (jsonify({"error": "No file selected"}), 400)
+    if not file.filename.endswith(".pdf"):
+        return None, (jsonify({"error": "Only PDF files are supported"}), 400)
+    return file, None
 
-        # Save input file
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        original_filename = secure_filename(file.filename)
-        filename = f"{timestamp}_{original_filename}"
-        input_path = UPLOAD_FOLDER / filename
-        file.save(input_path)
-
-        # Run detection + redaction
-        signatures = detect_signatures(str(input_path))
-        redacted_filename = (
-            f"redacted_{filename}" if not highlight_only else f"highlighted_{filename}"
-        )
-        redacted_path = OUTPUT_FOLDER / redacted_filename
-        redacted_path_str, entities_detected = detect_and_redact_text_near_signatures(
-            str(input_path),
+
+def upload_names(file):
+    """Returns (original_filename, filename): the secured name and its timestamped variant."""
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    original_filename = secure_filename(file.filename)
+    return original_filename, f"{timestamp}_{original_filename}"
+
+
+def save_upload(file):
+    """Saves an uploaded PDF under data/ (queued jobs). Returns (input_path, original_filename, filename)."""
+    original_filename, filename = upload_names(file)
+    # Unique on disk: same-name uploads within one second must not share (or delete) a file
+    input_path = UPLOAD_FOLDER / f"{uuid.uuid4().hex}_{filename}"
+    file.save(input_path)
+    return input_path, original_filename, filename
+
+
+def write_audit_log(entry):
+    # Queued; the store's writer thread appends entries in batches
+    audit_store.write(entry)
+
+
+def memory_mb(nbytes):
+    # Peak page-buffer memory for audit entries (None when nothing was rendered, e.g. cache hits)
+    return round(nbytes / (1024 * 1024), 1) if nbytes else None
+
+
+def document_stats(session=None):
+    """
+    Per-document figures for audit entries, job status and batch summaries.
+    - peak_memory_mb: largest page-buffer footprint.
+    - page_screen: pages scanned and pages skipped by the pre-filter, with reasons.
+    Both are None when nothing was rendered (result cache hits).
+    """
+    if session is None:
+        return {"peak_memory_mb": None, "page_screen": None}
+    return {"peak_memory_mb": memory_mb(session.peak_bytes), "page_screen": screening_report(session)}
+
+
+def output_name(filename, highlight_only):
+    return f"highlighted_{filename}" if highlight_only else f"redacted_{filename}"
+
+
+def run_pipeline(source, output, privacy_mode, redaction_style, highlight_only):
+    """
+    Detection + redaction for one PDF, served from the result cache when possible.
+    - source: PDF bytes (uploads, kept in memory) or a path (queued jobs).
+    - output: path or writable binary file object the processed PDF is written to.
+    Returns: (signatures, entities_detected, stats). Raises if redaction fails.
+    stats: see document_stats.
+    """
+    settings = {"privacy_mode": privacy_mode, "redaction_style": redaction_style, "highlight_only": highlight_only}
+    # Analyses (and so outputs) depend on the document and the mode's semantic anchors/backend
+    variant = anchor_key(privacy_mode)
+    if result_cache:
+        digest = bytes_digest(source) if isinstance(source, bytes) else file_digest(source)
+        cached_output = result_cache.get_output(digest, settings, variant)
+        if cached_output:
+            # Same bytes, same settings: copy so the cached file can be evicted independently
+            cached_pdf, signatures, entities_detected = cached_output
+            if hasattr(output, "write"):
+                with open(cached_pdf, "rb") as f:
+                    shutil.copyfileobj(f, output)
+            else:
+                shutil.copyfile(cached_pdf, output)
+            return signatures, entities_detected, document_stats()
+    # Run detection + redaction on one shared session (each page rendered once,
+    # pages fanned out over the worker pool for long documents)
+    with DocumentSession(source) as session:
+        cached_analysis = result_cache.get_analysis(digest, variant) if result_cache else None
+        if cached_analysis:
+            signatures, analyses = cached_analysis  # Settings changed: only redo redaction
+        else:
+            signatures, analyses = analyze_document(session, privacy_mode=privacy_mode)
+            if result_cache:
+                result_cache.put_analysis(digest, signatures, analyses, variant)
+        _, entities_detected = detect_and_redact_text_near_signatures(
+            session,
             signatures,
-            str(redacted_path),
+            output,
             privacy_mode,
             redaction_style,
             highlight_only,
+            analyses=analyses,
         )
+    if result_cache:
+        result_cache.put_output(digest, settings, output, signatures, entities_detected, variant)
+    return signatures, entities_detected, document_stats(session)
+
+
+def remove_input(input_path):
+    try:
+        input_path.unlink()
+    except Exception as cleanup_error:
+        print(f"Failed to delete temporary file {input_path}: {cleanup_error}")
 
-        # Clean up input file
-        try:
-            input_path.unlink()
-        except Exception as cleanup_error:
-            print(f"Failed to delete temporary file {input_path}: {cleanup_error}")
 
-        if redacted_path_str is None:
-            raise Exception("Redaction failed")
+@app.route("/api/upload", methods=["POST"])
+def upload_file():
+    try:
+        file, error_response = validate_upload(request.files)
+        if error_response:
+            return error_response
+
+        # Settings
+        settings = read_settings(request.form)
+        privacy_mode = settings["privacy_mode"]
+        redaction_style = settings["redaction_style"]
+        highlight_only = settings["highlight_only"]
+
+        # Keep the upload in memory (werkzeug spools large bodies to a temp file)
+        original_filename, filename = upload_names(file)
+        data = file.read()
+
+        # Run detection + redaction into a spooled buffer: in memory for typical PDFs,
+        # a self-deleting temp file for large ones
+        output = tempfile.SpooledTemporaryFile(max_size=OUTPUT_SPOOL_BYTES)
+        try:
+            signatures, entities_detected, stats = run_pipeline(data, output, privacy_mode, redaction_style, highlight_only)
+        except Exception:
+            output.close()
+            raise
+        output.seek(0)
 
         # Audit log
-        audit_log = {
+        write_audit_log({
             "timestamp": datetime.datetime.now().isoformat(),
             "file": original_filename,
             "privacy_mode": privacy_mode,
@@ -94,24 +278,24 @@ def upload_file():
             "signatures_detected": len(signatures),
             "entities_redacted": entities_detected,
             "highlight_only": highlight_only,
+            **stats,
+            "timings": g.trace.summary(),
             "error": None,
-        }
-        with open(UPLOAD_FOLDER / "audit_log.json", "a") as f:
-            json.dump(audit_log, f)
-            f.write("\n")
+        })
 
-        return send_file(redacted_path_str, as_attachment=True, download_name=redacted_filename)
+        # The buffer is closed (and any temp file removed) when the response finishes
+        return send_file(output, mimetype="application/pdf", as_attachment=True, download_name=output_name(filename, highlight_only))
 
     except Exception as e:
         # Error handling + logging
         error_details = f"{str(e)}\n{traceback.format_exc()}"
-        filename = file.filename if "file" in locals() else "unknown"
+        filename = file.filename if "file" in locals() and file is not None else "unknown"
         privacy_mode = request.form.get("privacy_mode", "unknown") if "request" in locals() else "unknown"
         redaction_style = request.form.get("redaction_style", "unknown") if "request" in locals() else "unknown"
         highlight_only = request.form.get("highlight_only", "false").lower() == "true"
         signatures_detected = len(signatures) if "signatures" in locals() else 0
 
-        audit_log = {
+        write_audit_log({
             "timestamp": datetime.datetime.now().isoformat(),
             "file": filename,
             "privacy_mode": privacy_mode,
@@ -119,40 +303,394 @@ def upload_file():
             "highlight_only": highlight_only,
             "signatures_detected": signatures_detected,
             "entities_redacted": {"PERSON": 0, "DATE": 0, "GPE": 0},
+            "timings": g.trace.summary() if "trace" in g else None,
             "error": error_details,
+        })
+
+        return jsonify({"error": str(e)}), 500
+
+
+def ndjson(event):
+    return json.dumps(event) + "\n"
+
+
+@app.route("/api/upload/stream", methods=["POST"])
+def upload_stream():
+    """
+    Same processing and audit entry as /api/upload, reported while it runs: an NDJSON
+    stream of per-page events (see pipeline.stream_document), ending with either
+    {"event": "result", ..., "download_name", "pdf": base64} or {"event": "error", "error"}.
+    """
+    file, error_response = validate_upload(request.files)
+    if error_response:
+        return error_response
+    settings = read_settings(request.form)
+    original_filename, filename = upload_names(file)
+    data = file.read()
+
+    def events():
+        signatures = []
+        trace, token = metrics.start_trace()  # Spans recorded while the response streams
+        try:
+            digest = bytes_digest(data) if result_cache else None
+            variant = anchor_key(settings["privacy_mode"])
+            cached_output = result_cache.get_output(digest, settings, variant) if result_cache else None
+            output = io.BytesIO()
+            if cached_output:
+                cached_pdf, signatures, entities_detected = cached_output
+                with open(cached_pdf, "rb") as f:
+                    shutil.copyfileobj(f, output)
+                stats = document_stats()
+                yield ndjson({"event": "start", "pages": None, "pages_scanned": None, "pages_skipped": None, "cached": True})
+            else:
+                with DocumentSession(data) as session:
+                    cached_analysis = result_cache.get_analysis(digest, variant) if result_cache else None
+                    for event in stream_document(session, output, analysis=cached_analysis, **settings):
+                        if event["event"] == "done":
+                            signatures, analyses, entities_detected = event["signatures"], event["analyses"], event["entities_redacted"]
+                        else:
+                            yield ndjson(event)
+                    stats = document_stats(session)
+                if result_cache:
+                    if cached_analysis is None:
+                        result_cache.put_analysis(digest, signatures, analyses, variant)
+                    result_cache.put_output(digest, settings, output, signatures, entities_detected, variant)
+            write_audit_log({
+                "timestamp": datetime.datetime.now().isoformat(),
+                "file": original_filename,
+                **settings,
+                "signatures_detected": len(signatures),
+                "entities_redacted": entities_detected,
+                **stats,
+                "timings": trace.summary(),
+                "error": None,
+            })
+            yield ndjson({
+                "event": "result",
+                "signatures_detected": len(signatures),
+                "entities_redacted": entities_detected,
+                **stats,
+                "timings": trace.summary()["stages"],
+                "download_name": output_name(filename, settings["highlight_only"]),
+                "pdf": base64.b64encode(output.getbuffer()).decode("ascii"),
+            })
+        except Exception as e:
+            write_audit_log({
+                "timestamp": datetime.datetime.now().isoformat(),
+                "file": original_filename,
+                **settings,
+                "signatures_detected": len(signatures),
+                "entities_redacted": {"PERSON": 0, "DATE": 0, "GPE": 0},
+                "timings": trace.summary(),
+                "error": f"{str(e)}\n{traceback.format_exc()}",
+            })
+            yield ndjson({"event": "error", "error": str(e)})
+        finally:
+            metrics.end_trace(token)
+
+    # No proxy buffering: each event should reach the client as soon as it is written
+    return Response(stream_with_context(events()), mimetype="application/x-ndjson", headers={"X-Accel-Buffering": "no"})
+
+
+def run_job(job):
+    """JobQueue handler: same pipeline and audit entry as /api/upload, off the request thread."""
+    params = job["params"]
+    input_path = params["input_path"]
+    settings = params["settings"]
+    signatures = []
+    trace, token = metrics.start_trace()  # Job threads are outside any request context
+    try:
+        # Results wait on disk for the client; JobQueue deletes them when the job expires
+        redacted_filename = output_name(params["filename"], settings["highlight_only"])
+        redacted_path = OUTPUT_FOLDER / f"{job['id']}_{redacted_filename}"  # One result file per job
+        signatures, entities_detected, stats = run_pipeline(
+            input_path, redacted_path, settings["privacy_mode"], settings["redaction_style"], settings["highlight_only"]
+        )
+        write_audit_log({
+            "timestamp": datetime.datetime.now().isoformat(),
+            "file": params["original_filename"],
+            **settings,
+            "signatures_detected": len(signatures),
+            "entities_redacted": entities_detected,
+            **stats,
+            "timings": trace.summary(),
+            "error": None,
+        })
+        return {
+            "result_path": str(redacted_path),
+            "download_name": redacted_filename,
+            "signatures_detected": len(signatures),
+            "entities_redacted": entities_detected,
+            **stats,
         }
-        with open(UPLOAD_FOLDER / "audit_log.json", "a") as f:
-            json.dump(audit_log, f)
-            f.write("\n")
+    except Exception as e:
+        write_audit_log({
+            "timestamp": datetime.datetime.now().isoformat(),
+            "file": params["original_filename"],
+            **settings,
+            "signatures_detected": len(signatures),
+            "entities_redacted": {"PERSON": 0, "DATE": 0, "GPE": 0},
+            "timings": trace.summary(),
+            "error": f"{str(e)}\n{traceback.format_exc()}",
+        })
+        raise
+    finally:
+        metrics.end_trace(token)
+        remove_input(input_path)
+
+
+job_queue = JobQueue(run_job)
 
-        if "input_path" in locals():
-            try:
-                input_path.unlink()
-            except Exception as cleanup_error:
-                print(f"Failed to delete temporary file {input_path}: {cleanup_error}")
 
+def job_status(job):
+    # Public view of a job (no server paths)
+    status = {k: job.get(k) for k in ("id", "status", "created", "started", "finished", "error")}
+    status["file"] = job["params"]["original_filename"]
+    if job["status"] == "done":
+        status["signatures_detected"] = job["signatures_detected"]
+        status["entities_redacted"] = job["entities_redacted"]
+        status["peak_memory_mb"] = job.get("peak_memory_mb")
+        status["page_screen"] = job.get("page_screen")
+        status["result_url"] = f"/api/jobs/{job['id']}/result"
+    return status
+
+
+@app.route("/api/jobs", methods=["POST"])
+def submit_job():
+    file, error_response = validate_upload(request.files)
+    if error_response:
+        return error_response
+    settings = read_settings(request.form)
+    input_path, original_filename, filename = save_upload(file)
+    try:
+        job = job_queue.submit(
+            input_path=input_path,
+            original_filename=original_filename,
+            filename=filename,
+            settings=settings,
+        )
+    except QueueFull as e:
+        remove_input(input_path)
+        response = jsonify({"error": str(e)})
+        response.headers["Retry-After"] = "5"
+        return response, 503
+    return jsonify(job_status(job)), 202
+
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job_status(job))
+
+
+@app.route("/api/jobs/<job_id>/result", methods=["GET"])
+def get_job_result(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    if job["status"] != "done":
+        return jsonify({"error": f"Job is {job['status']}", **job_status(job)}), 409
+    return send_file(job["result_path"], as_attachment=True, download_name=job["download_name"])
+
+
+class BatchTooLarge(Exception):
+    """Raised by read_batch_files when a batch goes over the file count or size limits."""
+
+
+def read_batch_files(files):
+    """
+    Returns [(filename, pdf_bytes)] from several uploaded PDFs and/or zip archives of PDFs.
+    Raises BatchTooLarge when the files would go over BATCH_MAX_FILES, BATCH_MAX_FILE_BYTES
+    or BATCH_MAX_TOTAL_BYTES: uploads are read at most one byte past the per-file limit,
+    and a zip's members are all checked before any is extracted.
+    """
+    pdfs = []
+    count, total = 0, 0
+
+    def check(name, size):
+        nonlocal count, total
+        count += 1
+        total += size
+        if count > BATCH_MAX_FILES:
+            raise BatchTooLarge(f"Too many files (more than {BATCH_MAX_FILES})")
+        if size > BATCH_MAX_FILE_BYTES:
+            raise BatchTooLarge(f"{name} is larger than {BATCH_MAX_FILE_BYTES // (1024 * 1024)} MB")
+        if total > BATCH_MAX_TOTAL_BYTES:
+            raise BatchTooLarge(f"Batch is larger than {BATCH_MAX_TOTAL_BYTES // (1024 * 1024)} MB")
+
+    for file in files.getlist("files") + files.getlist("file"):
+        name = secure_filename(file.filename or "")
+        if name.lower().endswith(".zip"):
+            with zipfile.ZipFile(file.stream) as archive:
+                members = [info for info in archive.infolist() if not info.is_dir() and info.filename.lower().endswith(".pdf")]
+                # Whole archive checked from its directory first, by declared uncompressed
+                # size (extraction stops there, so it also bounds what is read)
+                names = [secure_filename(Path(info.filename).name) for info in members]
+                for member, info in zip(names, members):
+                    check(member, info.file_size)
+                for member, info in zip(names, members):
+                    pdfs.append((member, archive.read(info)))
+        elif name.lower().endswith(".pdf"):
+            data = file.read(BATCH_MAX_FILE_BYTES + 1)
+            check(name, len(data))
+            pdfs.append((name, data))
+    return pdfs
+
+
+@app.route("/api/batch", methods=["POST"])
+def batch_upload():
+    """
+    Processes many PDFs (fields "files", or a zip) in one request.
+    Model inference is batched across all documents (see pipeline.analyze_documents).
+    Returns a zip of the processed PDFs plus summary.json with one entry per file.
+    """
+    try:
+        pdfs = read_batch_files(request.files)
+    except BatchTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    if not pdfs:
+        return jsonify({"error": "No PDF files found"}), 400
+    settings = read_settings(request.form)
+    prefix = "highlighted" if settings["highlight_only"] else "redacted"
+
+    sessions, summary = [], []
+    # Spooled zip: stays in memory for small batches, spills to disk for large ones.
+    # Each processed PDF goes straight into it from a per-document buffer.
+    archive_file = tempfile.SpooledTemporaryFile(max_size=64 * 1024 * 1024)
+    try:
+        with zipfile.ZipFile(archive_file, "w", zipfile.ZIP_DEFLATED) as archive:
+            opened, digests = [], []
+            for name, data in pdfs:
+                try:
+                    sessions.append(DocumentSession(data))
+                    opened.append(name)
+                    digests.append(bytes_digest(data))
+                except Exception as e:
+                    summary.append({"file": name, "signatures_detected": 0, "entities_redacted": {"PERSON": 0, "DATE": 0, "GPE": 0}, "error": f"Could not open PDF: {e}"})
+            # Reuse cached detection/analysis; only uncached documents go through the models
+            variant = anchor_key(settings["privacy_mode"])
+            results = [result_cache.get_analysis(digest, variant) if result_cache else None for digest in digests]
+            todo = [i for i, cached in enumerate(results) if cached is None]
+            for i, result in zip(todo, analyze_documents([sessions[i] for i in todo], privacy_mode=settings["privacy_mode"])):
+                results[i] = result
+                if result_cache:
+                    result_cache.put_analysis(digests[i], *result, variant)
+            written = set()
+            for i, (name, session, (signatures, analyses)) in enumerate(zip(opened, sessions, results)):
+                entry_name = f"{prefix}_{name}"
+                if entry_name in written:  # Same file name twice in one batch
+                    entry_name = f"{prefix}_{i}_{name}"
+                output = io.BytesIO()
+                try:
+                    _, entities_detected = detect_and_redact_text_near_signatures(
+                        session,
+                        signatures,
+                        output,
+                        settings["privacy_mode"],
+                        settings["redaction_style"],
+                        settings["highlight_only"],
+                        analyses=analyses,
+                    )
+                    archive.writestr(entry_name, output.getbuffer())
+                    written.add(entry_name)
+                    error = None
+                except Exception as e:  # One bad document does not fail the batch
+                    entities_detected = {"PERSON": 0, "DATE": 0, "GPE": 0}
+                    error = str(e)
+                session.close()  # Free the document before the next one is redacted
+                summary.append({
+                    "file": name,
+                    "output": entry_name if error is None else None,
+                    "signatures_detected": len(signatures),
+                    "entities_redacted": entities_detected,
+                    **document_stats(session),
+                    "error": error,
+                })
+            archive.writestr("summary.json", json.dumps(summary, indent=2))
+    except Exception as e:
+        archive_file.close()
+        write_audit_log({
+            "timestamp": datetime.datetime.now().isoformat(),
+            "file": f"batch of {len(pdfs)} files",
+            **settings,
+            "signatures_detected": 0,
+            "entities_redacted": {"PERSON": 0, "DATE": 0, "GPE": 0},
+            "error": f"{str(e)}\n{traceback.format_exc()}",
+        })
         return jsonify({"error": str(e)}), 500
+    finally:
+        for session in sessions:
+            session.close()
+    archive_file.seek(0)
+
+    for entry in summary:
+        write_audit_log({
+            "timestamp": datetime.datetime.now().isoformat(),
+            "file": entry["file"],
+            **settings,
+            "signatures_detected": entry["signatures_detected"],
+            "entities_redacted": entry["entities_redacted"],
+            "peak_memory_mb": entry.get("peak_memory_mb"),
+            "page_screen": entry.get("page_screen"),
+            "error": entry["error"],
+        })
+
+    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    return send_file(archive_file, mimetype="application/zip", as_attachment=True, download_name=f"{prefix}_batch_{timestamp}.zip")
+
+
+def stream_json_array(entries):
+    # Yields a JSON array piece by piece so large logs are never held in memory
+    yield "["
+    for i, entry in enumerate(entries):
+        yield ("," if i else "") + json.dumps(entry)
+    yield "]"
 
 
 @app.route("/api/audit_log", methods=["GET"])
 def get_audit_log():
-    audit_log_path = UPLOAD_FOLDER / "audit_log.json"
+    """
+    Audit entries, oldest first, streamed as JSON.
+    - Filters: start / end (ISO date or datetime), file (substring), errors_only=true.
+    - tail=N: only the newest N matching entries.
+    - limit=N (+ cursor): one page as {"entries": [...], "next_cursor": ...};
+      without limit or tail the response is the full array, as before.
+    """
+    args = request.args
+    filters = {
+        "start": args.get("start"),
+        "end": args.get("end"),
+        "file": args.get("file"),
+        "errors_only": args.get("errors_only", "false").lower() == "true",
+    }
     try:
-        with open(audit_log_path, "r", encoding="utf-8") as f:
-            logs = [json.loads(line) for line in f]
-        return jsonify(logs)
-    except FileNotFoundError:
-        return jsonify([]), 200
+        # Reject malformed cursors and dates before anything streams
+        if args.get("cursor"):
+            int(args["cursor"].rpartition(":")[2])
+        _parse_time(filters["start"])
+        _parse_time(filters["end"], end=True)
+        audit_store.flush()  # Include entries still queued in this process
+        if args.get("tail"):
+            tail = min(int(args["tail"]), AUDIT_PAGE_MAX)
+            return jsonify(audit_store.tail(tail, **filters))
+        if args.get("limit"):
+            limit = max(1, min(int(args["limit"]), AUDIT_PAGE_MAX))
+            entries, next_cursor = audit_store.page(limit, cursor=args.get("cursor"), **filters)
+            return jsonify({"entries": entries, "next_cursor": next_cursor})
+        entries = (entry for entry, _ in audit_store.iter_entries(cursor=args.get("cursor"), **filters))
+        return Response(stream_json_array(entries), mimetype="application/json")
+    except ValueError as e:
+        return jsonify({"error": f"Invalid audit log query: {str(e)}"}), 400
     except Exception as e:
         return jsonify({"error": f"Failed to read audit log: {str(e)}"}), 500
 
 
 @app.route("/api/clear_logs", methods=["POST"])
 def clear_logs():
-    audit_log_path = UPLOAD_FOLDER / "audit_log.json"
     try:
-        with open(audit_log_path, "w") as f:
-            pass
+        audit_store.clear()
         return jsonify({"status": "Logs cleared"})
     except Exception as e:
         return jsonify({"error": f"Failed to clear logs: {str(e)}"}), 500
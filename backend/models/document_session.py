@@ -0,0 +1,132 @@
+# backend/models/document_session.py
+import os
+import tempfile
+import fitz  # PyMuPDF
+import numpy as np
+from pathlib import Path
+from models.metrics import span
+
+RENDER_DPI = 200  # Highest resolution any stage needs (signature detection)
+
+
+class DocumentSession:
+    """
+    Opens a PDF once and renders each page at most once.
+    - Signature detection and text redaction share the same fitz.Document.
+    - Page rasters are cached as RGB numpy arrays at RENDER_DPI.
+    - Crops returned by crop() are views into the cached raster (no copy).
+    - source: a path, PDF bytes, or a readable binary stream (e.g. an upload).
+    """
+
+    def __init__(self, source, dpi=RENDER_DPI):
+        if hasattr(source, "read"):
+            # Upload stream / spooled file: opened from memory, never copied to data/
+            source = source.read()
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self.data = bytes(source)
+            self.doc = fitz.open(stream=self.data, filetype="pdf")
+            self.path = None
+        else:
+            self.data = None
+            self.path = Path(source)
+            self.doc = fitz.open(self.path)
+        self.dpi = dpi
+        self.scale = dpi / 72.0
+        self._pixmaps = {}  # page_num -> fitz.Pixmap (keeps the raster buffer alive)
+        self._rasters = {}  # page_num -> np.ndarray view over the pixmap samples
+        self.peak_bytes = 0  # Largest raster cache + transient page buffers seen (see note_memory)
+        self.screening = {}  # page_num -> (scan, reason) from the page pre-filter (see page_filter)
+        self._spool = None  # Temp copy of in-memory PDF bytes for pool workers (see source)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.doc)
+
+    @property
+    def source(self):
+        # Path another process can reopen the same document from. In-memory PDFs are
+        # spooled to a private temp file once (removed on close), so pool tasks pickle a
+        # path instead of the whole document each.
+        if self.path is not None:
+            return str(self.path)
+        if self._spool is None:
+            fd, self._spool = tempfile.mkstemp(prefix="sigsecure_", suffix=".pdf")
+            with os.fdopen(fd, "wb") as f:
+                f.write(self.data)
+        return self._spool
+
+    def page(self, page_num):
+        return self.doc[page_num]
+
+    def raster(self, page_num):
+        """RGB raster (H x W x 3, uint8) of a 0-indexed page, rendered on first use."""
+        if page_num not in self._rasters:
+            with span("rasterize", page_num):
+                pix = self.doc[page_num].get_pixmap(dpi=self.dpi, alpha=False)
+            self._pixmaps[page_num] = pix
+            # samples_mv exposes the pixmap buffer without copying it
+            self._rasters[page_num] = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+            self.note_memory(0)
+        return self._rasters[page_num]
+
+    def has_raster(self, page_num):
+        return page_num in self._rasters
+
+    def cached_bytes(self):
+        return sum(raster.nbytes for raster in self._rasters.values())
+
+    def note_memory(self, nbytes):
+        """Records nbytes of transient page buffers on top of the raster cache for peak_bytes."""
+        self.peak_bytes = max(self.peak_bytes, self.cached_bytes() + nbytes)
+
+    def crop(self, page_num, rect):
+        """
+        Returns (view, origin) for a page-space rect: a numpy view into the cached
+        page raster and the page-space (x, y) of the view's top-left pixel.
+        """
+        img = self.raster(page_num)
+        h, w = img.shape[:2]
+        x0 = min(max(0, int(rect[0] * self.scale)), w)
+        y0 = min(max(0, int(rect[1] * self.scale)), h)
+        x1 = min(max(x0, int(np.ceil(rect[2] * self.scale))), w)
+        y1 = min(max(y0, int(np.ceil(rect[3] * self.scale))), h)
+        return img[y0:y1, x0:x1], (x0 / self.scale, y0 / self.scale)
+
+    def to_page(self, px_rect, origin):
+        """Converts a pixel rect inside a crop back to page coordinates."""
+        return fitz.Rect(
+            origin[0] + px_rect[0] / self.scale,
+            origin[1] + px_rect[1] / self.scale,
+            origin[0] + px_rect[2] / self.scale,
+            origin[1] + px_rect[3] / self.scale,
+        )
+
+    def release(self, page_num):
+        # Drop a page raster once no later stage needs it
+        self._rasters.pop(page_num, None)
+        self._pixmaps.pop(page_num, None)
+
+    def release_all(self):
+        self._rasters.clear()
+        self._pixmaps.clear()
+
+    def close(self):
+        self._rasters.clear()
+        self._pixmaps.clear()
+        if not self.doc.is_closed:
+            self.doc.close()
+        if self._spool is not None:
+            os.unlink(self._spool)
+            self._spool = None
+
+
+def open_session(source):
+    """Returns (session, owned): wraps a path/bytes/stream in a new session, or reuses an existing one."""
+    if isinstance(source, DocumentSession):
+        return source, False
+    return DocumentSession(source), True
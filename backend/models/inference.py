@@ -0,0 +1,151 @@
+# backend/models/inference.py
+import os
+import sys
+import time
+import queue
+import threading
+from concurrent.futures import Future
+import numpy as np
+from models.registry import get_nlp, get_bert_model
+from models.metrics import inference_batch_items
+
+# Model calls from every request/job thread go through one executor per model, which
+# bounds how many run at once and merges concurrent requests into shared batches.
+ENCODE_BATCH_SIZE = 64  # Sentences per SentenceTransformer forward pass
+NLP_BATCH_SIZE = 32  # Texts per nlp.pipe batch
+BATCH_WAIT = float(os.environ.get("SIGSECURE_BATCH_WAIT_MS", 5)) / 1000  # Wait for more requests after the first
+BATCH_MAX_ITEMS = int(os.environ.get("SIGSECURE_BATCH_MAX_ITEMS", 256))
+# Sentence-BERT batches running at once; each uses SIGSECURE_BERT_THREADS intra-op threads
+BERT_CONCURRENCY = int(os.environ.get("SIGSECURE_BERT_CONCURRENCY", 1))
+
+
+def _gevent_patched():
+    monkey = sys.modules.get("gevent.monkey")
+    return monkey is not None and monkey.is_module_patched("threading")
+
+
+class MicroBatcher:
+    """
+    Runs fn(items) -> results (one per item) for items submitted from many threads.
+    - submit() blocks its caller until its items are processed; results keep their order.
+    - A batch closes after max_items items, or max_wait seconds after its first request.
+    - threads: batches run at once, i.e. the concurrency limit for the model.
+    - Executor threads start lazily per process (they do not survive a fork).
+    """
+
+    def __init__(self, name, fn, threads=1, max_items=BATCH_MAX_ITEMS, max_wait=BATCH_WAIT):
+        self.name = name
+        self.fn = fn
+        self.threads = threads
+        self.max_items = max_items
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.items = 0
+
+    def _ensure_workers(self):
+        if self._pid != os.getpid():
+            with self._start_lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue()  # Never share a queue (and its locks) with the parent
+                    for i in range(self.threads):
+                        threading.Thread(target=self._worker, name=f"{self.name}-executor-{i}", daemon=True).start()
+                    self._pid = os.getpid()
+
+    def submit(self, items):
+        """Processes items (possibly batched with other callers') and returns their results."""
+        items = list(items)
+        if not items:
+            return []
+        self._ensure_workers()
+        future = Future()
+        self._queue.put((items, future))
+        return future.result()
+
+    def _collect(self):
+        # First request blocks; later ones join until the batch is full or the window closes
+        requests = [self._queue.get()]
+        count = len(requests[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while count < self.max_items:
+            remaining = deadline - time.monotonic()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            requests.append(request)
+            count += len(request[0])
+        return requests
+
+    def _run(self, items):
+        if _gevent_patched():
+            # Real OS thread, so the hub keeps serving other greenlets during inference
+            import gevent
+            return gevent.get_hub().threadpool.apply(self.fn, (items,))
+        return self.fn(items)
+
+    def _worker(self):
+        while True:
+            requests = self._collect()
+            items = [item for batch, _ in requests for item in batch]
+            inference_batch_items.observe(self.name, len(items))
+            with self._stats_lock:
+                self.requests += len(requests)
+                self.batches += 1
+                self.items += len(items)
+            try:
+                results = self._run(items)
+            except Exception as e:
+                for _, future in requests:
+                    future.set_exception(e)
+                continue
+            offset = 0
+            for batch, future in requests:
+                future.set_result(results[offset:offset + len(batch)])
+                offset += len(batch)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "concurrency": self.threads,
+                "requests": self.requests,
+                "batches": self.batches,
+                "items": self.items,
+                "mean_batch_items": round(self.items / self.batches, 2) if self.batches else 0.0,
+                "queued": self._queue.qsize(),
+            }
+
+
+def _encode(sentences):
+    return get_bert_model().encode(sentences, batch_size=ENCODE_BATCH_SIZE, normalize_embeddings=True)
+
+
+def _parse(texts):
+    return list(get_nlp().pipe(texts, batch_size=NLP_BATCH_SIZE))
+
+
+bert_executor = MicroBatcher("sentence_bert", _encode, threads=BERT_CONCURRENCY)
+spacy_executor = MicroBatcher("spacy", _parse, threads=1)  # spaCy pipelines are not thread-safe
+
+
+def encode(sentences):
+    """Unit Sentence-BERT embeddings (len(sentences) x dim), via the shared executor."""
+    return np.stack(bert_executor.submit(sentences))
+
+
+def encode_inline(sentences):
+    """Unit embeddings computed in the calling thread, without starting the executor (warm-up before fork)."""
+    return np.stack(_encode(list(sentences)))
+
+
+def parse(texts):
+    """spaCy Docs (sentences + entities) for texts, via the shared executor."""
+    return spacy_executor.submit(texts)
+
+
+def stats():
+    return {executor.name: executor.stats() for executor in (bert_executor, spacy_executor)}
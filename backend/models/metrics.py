@@ -0,0 +1,173 @@
+# backend/models/metrics.py
+import os
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Stage timings for the whole process (Prometheus histograms) and for the current
+# request (Trace). Spans are cheap: a perf_counter pair and a short lock.
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram per label value, rendered in Prometheus text format."""
+
+    def __init__(self, name, help_text, label, buckets=BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.label = label
+        self.buckets = buckets
+        self._series = {}  # label value -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, label_value, seconds):
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[i] += 1
+            series[-2] += 1
+            series[-1] += seconds
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((k, list(v)) for k, v in self._series.items())
+        for value, series in items:
+            label = f'{self.label}="{value}"'
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {series[-2]}')
+            lines.append(f"{self.name}_sum{{{label}}} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{label}}} {series[-2]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text, labels):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, count in items:
+            label = ",".join(f'{k}="{v}"' for k, v in zip(self.labels, values))
+            lines.append(f"{self.name}{{{label}}} {count}" if label else f"{self.name} {count}")
+        return lines
+
+
+stage_seconds = Histogram("sigsecure_stage_seconds", "Time spent per pipeline stage.", "stage")
+request_seconds = Histogram("sigsecure_request_seconds", "HTTP request latency by endpoint.", "endpoint")
+requests_total = Counter("sigsecure_requests_total", "HTTP requests by endpoint and status.", ("endpoint", "status"))
+pages_total = Counter("sigsecure_pages_total", "Pages run through signature detection.", ())
+inference_batch_items = Histogram(
+    "sigsecure_inference_batch_items", "Items per model executor batch.", "model",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+pages_skipped = Counter("sigsecure_pages_skipped_total", "Pages the pre-filter skipped, by reason.", ("reason",))
+
+
+class Trace:
+    """Spans recorded while handling one request or job: (stage, page or None, seconds)."""
+
+    def __init__(self):
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, stage, page, seconds):
+        with self._lock:
+            self.spans.append((stage, page, seconds))
+
+    def page(self, page):
+        """{stage: seconds} recorded so far for one 0-indexed page, 4-decimal totals."""
+        stages = {}
+        with self._lock:
+            spans = list(self.spans)
+        for stage, span_page, seconds in spans:
+            if span_page == page:
+                stages[stage] = stages.get(stage, 0.0) + seconds
+        return {k: round(v, 4) for k, v in stages.items()}
+
+    def summary(self):
+        """{"stages": {stage: seconds}, "pages": {page: {stage: seconds}}} with 4-decimal totals."""
+        stages, pages = {}, {}
+        for stage, page, seconds in self.spans:
+            stages[stage] = stages.get(stage, 0.0) + seconds
+            if page is not None:
+                per_page = pages.setdefault(str(page + 1), {})
+                per_page[stage] = per_page.get(stage, 0.0) + seconds
+        return {
+            "stages": {k: round(v, 4) for k, v in stages.items()},
+            "pages": {p: {k: round(v, 4) for k, v in s.items()} for p, s in pages.items()},
+        }
+
+
+_trace = contextvars.ContextVar("sigsecure_trace", default=None)
+_hooks = []  # callables(stage, page, seconds), e.g. an external profiler
+
+
+def add_hook(hook):
+    """Registers hook(stage, page, seconds), called after every span (profiling/tracing integrations)."""
+    _hooks.append(hook)
+
+
+def start_trace():
+    """Starts collecting spans for the current context (thread/request). Returns (trace, token)."""
+    trace = Trace()
+    return trace, _trace.set(trace)
+
+
+def end_trace(token):
+    _trace.reset(token)
+
+
+def current_trace():
+    return _trace.get()
+
+
+def record(stage, seconds, page=None):
+    stage_seconds.observe(stage, seconds)
+    trace = _trace.get()
+    if trace is not None:
+        trace.add(stage, page, seconds)
+    for hook in _hooks:
+        hook(stage, page, seconds)
+
+
+@contextmanager
+def span(stage, page=None):
+    """Times the block as one span of stage (page: 0-indexed, if the work belongs to one page)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start, page)
+
+
+def merge(spans):
+    """Replays spans recorded in a worker process into this process's histograms and trace."""
+    for stage, page, seconds in spans:
+        record(stage, seconds, page)
+
+
+def render():
+    """All metrics in Prometheus text exposition format."""
+    lines = []
+    for metric in (stage_seconds, request_seconds, inference_batch_items, requests_total, pages_total, pages_skipped):
+        lines.extend(metric.render())
+    lines.append("# HELP sigsecure_process_id Process serving this scrape (metrics are per process).")
+    lines.append("# TYPE sigsecure_process_id gauge")
+    lines.append(f"sigsecure_process_id {os.getpid()}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,114 @@
+# backend/models/ocr_prep.py
+import os
+import cv2
+import numpy as np
+
+# Default preprocessing: a fixed contrast boost on every crop, and a light Gaussian
+# blur for the retry pass when confidence stays low
+CONTRAST_ALPHA = 1.5
+CONTRAST_BETA = 50
+
+# Adaptive preprocessing (opt-in with SIGSECURE_OCR_ADAPTIVE=1; not the default until
+# scripts/check_ocr_preprocessing.py has been run and shows it matches the default on
+# confidence and word counts, which has not happened yet): one path per OCR clip, chosen from cheap measurements of the crop
+# instead of OCRing twice. Measured on the grayscale crop:
+#   noise       - spread of the paper background around its 3x3 median (grey levels)
+#   contrast    - mean paper level minus mean ink level (Otsu split)
+#   text_height - median height of glyph-sized connected components (pixels)
+# Paths: "plain" (grayscale only), "stretch" (ink/paper levels stretched to 0-255),
+# "denoise" (3x3 median), "denoise_stretch" (both). Crops whose text is far from
+# TARGET_TEXT_HEIGHT are resized before OCR.
+NOISE_THRESHOLD = float(os.environ.get("SIGSECURE_OCR_NOISE", 6.0))
+LOW_CONTRAST = float(os.environ.get("SIGSECURE_OCR_CONTRAST", 110.0))
+# Tesseract reads best with glyphs around 20-30px; outside this band the crop is resized
+TARGET_TEXT_HEIGHT = 24
+RESIZE_BAND = (0.75, 1.5)  # Resize only when the factor falls outside this range
+MAX_RESIZE = 2.5
+MIN_GLYPH_HEIGHT = 6  # Pixels; smaller components are speckles
+ADAPTIVE = os.environ.get("SIGSECURE_OCR_ADAPTIVE", "0") == "1"
+
+# Tesseract settings for the adaptive path only (the default path keeps Tesseract's
+# defaults): --psm 6 reads the clip as one block of text (no page layout analysis),
+# a restricted language set keeps the models loaded small, and tessedit_do_invert=0
+# skips the white-on-black pass
+OCR_LANG = os.environ.get("SIGSECURE_OCR_LANG", "eng")
+OCR_PSM = int(os.environ.get("SIGSECURE_OCR_PSM", 6))
+OCR_CONFIG = f"--psm {OCR_PSM} -c tessedit_do_invert=0"
+
+
+def enhance(crop):
+    """Default preprocessing: the crop with its contrast increased."""
+    return cv2.convertScaleAbs(crop, alpha=CONTRAST_ALPHA, beta=CONTRAST_BETA)
+
+
+def soften(image):
+    """Default retry preprocessing: light Gaussian blur to denoise."""
+    return cv2.GaussianBlur(image, (3, 3), 0)
+
+
+def measure(gray, median=None):
+    """{"noise", "contrast", "text_height"} for a grayscale crop; text_height is None without text."""
+    if median is None:
+        median = cv2.medianBlur(gray, 3)
+    threshold, ink = cv2.threshold(median, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    paper = median > threshold
+    residual = gray.astype(np.int16) - median
+    noise = float(residual[paper].std()) if paper.any() else 0.0
+    contrast = float(median[paper].mean() - median[~paper].mean()) if paper.any() and (~paper).any() else 255.0
+    # Glyph height from the denoised ink mask; strokes of a signature are outliers the median ignores
+    _, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    heights = stats[1:, cv2.CC_STAT_HEIGHT]
+    widths = stats[1:, cv2.CC_STAT_WIDTH]
+    glyphs = heights[(heights >= MIN_GLYPH_HEIGHT) & (heights < gray.shape[0] / 2) & (widths < heights * 3)]
+    text_height = float(np.median(glyphs)) if glyphs.size else None
+    return {"noise": noise, "contrast": contrast, "text_height": text_height}
+
+
+def _stretch(gray):
+    # Ink level -> 0, paper level -> 255, via one lookup table
+    threshold, _ = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    paper = gray > threshold
+    if not paper.any() or paper.all():
+        return gray
+    ink_level, paper_level = float(gray[~paper].mean()), float(gray[paper].mean())
+    lut = np.clip((np.arange(256) - ink_level) * 255.0 / max(paper_level - ink_level, 1.0), 0, 255).astype(np.uint8)
+    return cv2.LUT(gray, lut)
+
+
+def choose_path(stats):
+    noisy = stats["noise"] > NOISE_THRESHOLD
+    low_contrast = stats["contrast"] < LOW_CONTRAST
+    if noisy:
+        return "denoise_stretch" if low_contrast else "denoise"
+    return "stretch" if low_contrast else "plain"
+
+
+def resize_factor(text_height):
+    """Scale that brings text_height near TARGET_TEXT_HEIGHT (1.0 inside RESIZE_BAND or without text)."""
+    if not text_height:
+        return 1.0
+    factor = TARGET_TEXT_HEIGHT / text_height
+    if RESIZE_BAND[0] <= factor <= RESIZE_BAND[1]:
+        return 1.0
+    return float(min(max(factor, 1.0 / MAX_RESIZE), MAX_RESIZE))
+
+
+def prepare(crop, path=None):
+    """
+    Adaptive preprocessing of an RGB (or grayscale) crop for Tesseract.
+    - path: force a preprocessing path; chosen from measure() when None.
+    Returns: (image, path, factor, stats); image is grayscale, resized by factor.
+    """
+    gray = cv2.cvtColor(crop, cv2.COLOR_RGB2GRAY) if crop.ndim == 3 else crop
+    median = cv2.medianBlur(gray, 3)
+    stats = measure(gray, median)
+    path = path or choose_path(stats)
+    image = median if path.startswith("denoise") else gray
+    if path.endswith("stretch"):
+        image = _stretch(image)
+    factor = resize_factor(stats["text_height"])
+    if factor != 1.0:
+        interpolation = cv2.INTER_CUBIC if factor > 1 else cv2.INTER_AREA
+        image = cv2.resize(image, None, fx=factor, fy=factor, interpolation=interpolation)
+        factor = image.shape[1] / gray.shape[1]  # Exact, after rounding to whole pixels
+    return image, path, factor, stats
@@ -0,0 +1,91 @@
+# backend/models/page_filter.py
+import os
+import fitz  # PyMuPDF
+import cv2
+import numpy as np
+from models.metrics import span, pages_skipped
+
+# Cheap per-page screen run before signature detection: a page is rasterized and
+# contour-searched only if something on it could be a signature. Checks, cheapest first:
+#   image     - the page draws an embedded image (scans, pasted signatures, photos)
+#   keyword   - the text layer mentions signing ("signature", "witness", ...)
+#   drawing   - vector paths with area (a drawn signature); plain rule lines do not count
+#   ink       - a thumbnail has ink outside the text layer's words (ink annotations, stamps)
+# Pages passing none of them are skipped as "text_only" (or "blank" without any text).
+PREFILTER = os.environ.get("SIGSECURE_PREFILTER", "1") == "1"
+THUMBNAIL_DPI = 24
+THUMBNAIL_INK_THRESHOLD = 200  # Same as the coarse detection pass
+# Share of thumbnail pixels that must be non-text ink before the page is scanned
+MIN_INK_DENSITY = float(os.environ.get("SIGSECURE_PREFILTER_INK", 0.0005))
+SIGNATURE_KEYWORDS = ("signature", "signed", "sign here", "signatory", "undersigned", "witness", "/s/")
+MIN_DRAWING_SIZE = 2.0  # Points; thinner paths are rules and borders
+
+
+def _has_keyword(text):
+    text = text.lower()
+    return any(keyword in text for keyword in SIGNATURE_KEYWORDS)
+
+
+def _has_drawing(page):
+    for path in page.get_drawings():
+        rect = path["rect"]
+        if rect.width > MIN_DRAWING_SIZE and rect.height > MIN_DRAWING_SIZE:
+            return True
+    return False
+
+
+def non_text_ink(page, words):
+    """Fraction of a grayscale thumbnail that is ink not covered by any text-layer word."""
+    pix = page.get_pixmap(dpi=THUMBNAIL_DPI, colorspace=fitz.csGRAY, alpha=False)
+    gray = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+    ink = (gray < THUMBNAIL_INK_THRESHOLD).astype(np.uint8)
+    scale = THUMBNAIL_DPI / 72.0
+    for x0, y0, x1, y1, *_ in words:
+        # One pixel of slack: glyph anti-aliasing spills past the word box
+        ink[max(0, int(y0 * scale) - 1):int(y1 * scale) + 2, max(0, int(x0 * scale) - 1):int(x1 * scale) + 2] = 0
+    return cv2.countNonZero(ink) / float(ink.size) if ink.size else 0.0
+
+
+def screen_page(page):
+    """
+    Decides whether a page can hold a signature.
+    Returns (scan, reason): reason names the first check that matched, or why the page is skipped.
+    """
+    if page.get_images():
+        return True, "image"
+    words = page.get_text("words")
+    if _has_keyword(" ".join(w[4] for w in words)):
+        return True, "keyword"
+    if _has_drawing(page):
+        return True, "drawing"
+    if non_text_ink(page, words) > MIN_INK_DENSITY:
+        return True, "ink"
+    return False, "text_only" if words else "blank"
+
+
+def screen_pages(session):
+    """
+    0-indexed pages of a DocumentSession worth running signature detection on.
+    - Every decision is recorded in session.screening ({page_num: (scan, reason)}) for the audit log.
+    - With SIGSECURE_PREFILTER=0 every page is scanned.
+    """
+    if not PREFILTER:
+        return list(range(len(session)))
+    pages = []
+    for page_num in range(len(session)):
+        with span("prefilter", page_num):
+            scan, reason = screen_page(session.page(page_num))
+        session.screening[page_num] = (scan, reason)
+        if scan:
+            pages.append(page_num)
+        else:
+            pages_skipped.inc(reason)
+    return pages
+
+
+def screening_report(session):
+    """{"pages_scanned": n, "pages_skipped": {page (1-indexed): reason}}, or None if nothing was screened."""
+    if not session.screening:
+        return None
+    skipped = {str(p + 1): reason for p, (scan, reason) in sorted(session.screening.items()) if not scan}
+    return {"pages_scanned": len(session.screening) - len(skipped), "pages_skipped": skipped}
@@ -0,0 +1,142 @@
+# backend/models/parallel.py
+import os
+import sys
+import signal
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+import cv2
+from models.document_session import DocumentSession
+from models import metrics
+
+# Worker count for page-level parallelism (1 disables the pool)
+WORKERS = int(os.environ.get("SIGSECURE_WORKERS", os.cpu_count() or 1))
+# Short documents are not worth the pool round trip
+PARALLEL_MIN_PAGES = int(os.environ.get("SIGSECURE_PARALLEL_MIN_PAGES", 4))
+
+_pool = None
+_pool_size = 0
+
+
+def _init_worker():
+    # One process per core: keep OpenCV/torch from spawning their own thread pools
+    cv2.setNumThreads(1)
+    if "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(1)
+    # Forked from a gunicorn worker: drop its signal handlers so the pool stops with the server
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+
+
+def pool_context():
+    # Forking while other threads run (request threads, model executors, the audit
+    # writer, job workers) can copy a lock one of them holds into the child, which then
+    # deadlocks. Fork only while this is the only thread; otherwise start workers from a
+    # fork server (no shared model pages: workers load the models they use themselves).
+    methods = multiprocessing.get_all_start_methods()
+    if "fork" in methods and threading.active_count() == 1:
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else None)
+
+
+def start_pool(workers=None):
+    """
+    Creates the shared pool and starts its processes now. Call it before any thread
+    starts (gunicorn post_fork) so the workers are forked safely and share the loaded
+    models copy-on-write. No-op when page parallelism is disabled.
+    """
+    workers = WORKERS if workers is None else workers
+    if workers > 1:
+        get_pool(workers).submit(int).result()  # Forked processes all start on first submit
+
+
+def get_pool(workers):
+    """
+    Process pool shared across requests, with at least `workers` processes. Made by
+    start_pool when possible; created here (from a fork server once threads run) on
+    first use or after a worker died.
+    """
+    global _pool, _pool_size
+    if _pool is None or _pool_size < workers:
+        shutdown_pool()
+        _pool = ProcessPoolExecutor(max_workers=workers, mp_context=pool_context(), initializer=_init_worker)
+        _pool_size = workers
+    return _pool
+
+
+def pool_workers(page_count, workers=None):
+    """Number of workers to use for a document (1 means run in-process)."""
+    workers = WORKERS if workers is None else workers
+    if page_count < PARALLEL_MIN_PAGES:
+        return 1
+    return max(1, min(workers, page_count))
+
+
+def _run_chunk(source, func, page_args):
+    # Each worker opens the PDF once per chunk, from the session's path (or its spool file).
+    # Spans go back to the parent, which owns the metrics and the request trace.
+    trace, token = metrics.start_trace()
+    try:
+        with DocumentSession(source) as session:
+            results = {page_num: func(session, page_num, *args) for page_num, args in page_args}
+            return results, session.peak_bytes, trace.spans
+    finally:
+        metrics.end_trace(token)
+
+
+def imap_pages(session, func, page_args, workers, chunk_pages=None):
+    """
+    Runs func(session, page_num, *args) for every (page_num, args) in page_args and yields
+    (page_num, result) as soon as each page (in-process) or pool chunk finishes.
+    - workers == 1 runs in-process on the given session (and its raster cache), in order.
+    - Otherwise pages are split into contiguous chunks across the process pool; the
+      session's peak_bytes takes the largest worker peak and worker spans are merged
+      into this process's metrics and trace. Chunks are yielded in completion order.
+    - chunk_pages: pages per pool task (default: about two tasks per worker). Smaller
+      chunks give earlier first results but reopen the document more often.
+    """
+    page_args = list(page_args)
+    if workers <= 1 or len(page_args) < 2:
+        for page_num, args in page_args:
+            yield page_num, func(session, page_num, *args)
+        return
+    if chunk_pages is None:
+        n_chunks = min(len(page_args), workers * 2)  # A little oversubscription evens out slow pages
+        chunk_pages = -(-len(page_args) // n_chunks)
+    chunks = [page_args[i:i + chunk_pages] for i in range(0, len(page_args), chunk_pages)]
+    pool = get_pool(workers)
+    futures, done = [], set()
+    try:
+        futures = [pool.submit(_run_chunk, session.source, func, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            chunk_results, peak_bytes, spans = future.result()
+            session.peak_bytes = max(session.peak_bytes, peak_bytes)  # Per-process peak
+            metrics.merge(spans)
+            for page_num, result in chunk_results.items():
+                done.add(page_num)
+                yield page_num, result
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM-killed): drop the pool so the next call starts fresh, finish in-process
+        shutdown_pool()
+        for page_num, args in page_args:
+            if page_num not in done:
+                yield page_num, func(session, page_num, *args)
+    finally:
+        for future in futures:
+            future.cancel()  # Consumer stopped early (e.g. a closed stream)
+
+
+def map_pages(session, func, page_args, workers):
+    """
+    Runs func(session, page_num, *args) for every (page_num, args) in page_args (see imap_pages).
+    Returns: {page_num: result}
+    """
+    return dict(imap_pages(session, func, page_args, workers))
+
+
+def shutdown_pool():
+    global _pool, _pool_size
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+    _pool, _pool_size = None, 0
@@ -0,0 +1,123 @@
+# backend/models/pipeline.py
+import numpy as np
+from models.document_session import open_session
+from models.parallel import map_pages, imap_pages, pool_workers
+from models.signature_detect import detect_page_signatures, detect_signatures
+from models.text_pipeline import analyze_page, analyze_signature_texts, plan_redactions, redact_page, finish_document
+from models.text_source import words_for_signatures
+from models.page_filter import screen_pages, screening_report
+from models.records import concat_signatures, signatures_to_list
+from models.metrics import pages_total, current_trace
+
+
+def analyze_page_full(session, page_num, privacy_mode="none"):
+    """Detection + text analysis for one page, so a worker renders it only once."""
+    page_sigs = detect_page_signatures(session, page_num)
+    return page_sigs, (analyze_page(session, page_num, page_sigs, privacy_mode) if len(page_sigs) else [])
+
+
+def analyze_document(source, workers=None, privacy_mode="none"):
+    """
+    Renders, thresholds, OCRs and runs NER page by page, across the process pool for long documents.
+    Pages the pre-filter rules out are skipped (see page_filter).
+    - source: PDF path, PDF bytes, or a DocumentSession.
+    - privacy_mode: selects the semantic anchors used by the text filter.
+    Returns: (signatures, analyses) ready for detect_and_redact_text_near_signatures(..., analyses=analyses);
+    signatures is a SIGNATURE_DTYPE array, analyses a list of Analysis aligned with it.
+    """
+    session, owned = open_session(source)
+    try:
+        pages = screen_pages(session)
+        pages_total.inc(amount=len(pages))
+        per_page = map_pages(session, analyze_page_full, [(p, (privacy_mode,)) for p in pages], pool_workers(len(pages), workers))
+        signatures = concat_signatures([per_page[page_num][0] for page_num in pages])
+        analyses = [analysis for page_num in pages for analysis in per_page[page_num][1]]
+        return signatures, analyses
+    finally:
+        if owned:
+            session.close()
+
+
+def analyze_documents(sessions, workers=None, privacy_mode="none"):
+    """
+    Batch variant of analyze_document for many open DocumentSessions.
+    - Detection and word extraction run per document.
+    - Sentence splitting, BERT encoding and NER run once over every signature of every
+      document, so the models see large batches instead of one signature at a time.
+    Returns: list of (signatures, analyses), aligned with sessions.
+    """
+    collected = []
+    for session in sessions:
+        signatures = detect_signatures(session, workers)
+        sig_words = words_for_signatures(session, signatures, expand=200)
+        collected.append((signatures, [words for _, words, _ in sig_words]))
+        session.release_all()  # Rasters are not needed again; keep batch memory flat
+    all_analyses = analyze_signature_texts([words for _, word_sets in collected for words in word_sets], privacy_mode)
+    results = []
+    offset = 0
+    for signatures, word_sets in collected:
+        results.append((signatures, all_analyses[offset:offset + len(word_sets)]))
+        offset += len(word_sets)
+    return results
+
+
+def _by_page(signatures, analyses):
+    # {page_num: (signatures, analyses)} keeping document order within each page
+    pages = {}
+    for page in np.unique(signatures["page"]):
+        idx = np.flatnonzero(signatures["page"] == page)
+        pages[int(page) - 1] = (signatures[idx], [analyses[i] for i in idx.tolist()])
+    return pages
+
+
+def stream_document(session, output, privacy_mode="none", redaction_style="black", highlight_only=False, analysis=None, workers=None):
+    """
+    analyze_document + detect_and_redact_text_near_signatures, reported page by page.
+    Yields event dicts:
+    - {"event": "start", "pages", "pages_scanned", "pages_skipped"}
+    - {"event": "page", "stage": "detect", "page", "signatures", "timings"} per scanned page, as it finishes
+    - {"event": "page", "stage": "redact", "page", "redactions", "entities", "timings"} per page with signatures
+    - {"event": "done", "signatures", "analyses", "entities_redacted"} once output holds the PDF
+      (signatures as a SIGNATURE_DTYPE array; page events carry JSON-ready lists)
+    Every page is analysed before the first redaction, so the output is the same as the
+    non-streaming pipeline's. Pages are 1-indexed; timings are the page's stage seconds
+    in the current metrics trace.
+    - analysis: cached (signatures, analyses); detect events are then replayed from it.
+    """
+    trace = current_trace()
+
+    def timings(page_num):
+        return trace.page(page_num) if trace is not None else None
+
+    if analysis is not None:
+        signatures, analyses = analysis
+        yield {"event": "start", "pages": len(session), "pages_scanned": None, "pages_skipped": None}
+        for page_num, (page_sigs, _) in sorted(_by_page(signatures, analyses).items()):
+            yield {"event": "page", "stage": "detect", "page": page_num + 1, "signatures": signatures_to_list(page_sigs), "timings": None}
+    else:
+        pages = screen_pages(session)
+        pages_total.inc(amount=len(pages))
+        report = screening_report(session) or {"pages_scanned": len(pages), "pages_skipped": {}}
+        yield {"event": "start", "pages": len(session), **report}
+        per_page = {}
+        # One page per pool task: the first event arrives after one page, not one chunk
+        page_args = [(p, (privacy_mode,)) for p in pages]
+        for page_num, result in imap_pages(session, analyze_page_full, page_args, pool_workers(len(pages), workers), chunk_pages=1):
+            per_page[page_num] = result
+            yield {"event": "page", "stage": "detect", "page": page_num + 1, "signatures": signatures_to_list(result[0]), "timings": timings(page_num)}
+        signatures = concat_signatures([per_page[page_num][0] for page_num in sorted(per_page)])
+        analyses = [analysis for page_num in sorted(per_page) for analysis in per_page[page_num][1]]
+
+    # Plans are per page (entities are de-duplicated within a page), so planning page by
+    # page gives the same redactions as planning the whole document
+    entities_detected = {"PERSON": 0, "DATE": 0, "GPE": 0}
+    for page_num, (page_sigs, page_analyses) in sorted(_by_page(signatures, analyses).items()):
+        plans, page_entities = plan_redactions(page_sigs, page_analyses, privacy_mode)
+        items = plans.get(page_num, [])
+        if items:
+            redact_page(session.page(page_num), items, redaction_style, highlight_only)
+        for label, count in page_entities.items():
+            entities_detected[label] += count
+        yield {"event": "page", "stage": "redact", "page": page_num + 1, "redactions": len(items), "entities": page_entities, "timings": timings(page_num)}
+    finish_document(session.doc, output)
+    yield {"event": "done", "signatures": signatures, "analyses": analyses, "entities_redacted": entities_detected}
@@ -0,0 +1,144 @@
+# backend/models/records.py
+import numpy as np
+
+# Typed, compact records passed between pipeline stages (and pickled to pool workers).
+# Signatures are one NumPy structured array per document; words are parallel arrays;
+# entities and analyses are __slots__ classes. All of them convert to and from the
+# JSON shapes used by the API, the audit log and the result cache.
+
+SIGNATURE_DTYPE = np.dtype([
+    ("page", np.int32),  # 1-indexed
+    ("bbox", np.float64, 4),  # x0, y0, x1, y1 in page coordinates
+    ("type", "U7"),  # "signer" or "witness"
+    ("is_photo", np.bool_),
+])
+
+
+def empty_signatures(n=0):
+    return np.zeros(n, dtype=SIGNATURE_DTYPE)
+
+
+def concat_signatures(arrays):
+    arrays = [a for a in arrays if len(a)]
+    return np.concatenate(arrays) if arrays else empty_signatures()
+
+
+def signatures_to_list(signatures):
+    """JSON-ready list of {"bbox", "type", "page", "is_photo"} dicts."""
+    return [
+        {"bbox": bbox, "type": sig_type, "page": page, "is_photo": is_photo}
+        for bbox, sig_type, page, is_photo in zip(
+            signatures["bbox"].tolist(), signatures["type"].tolist(), signatures["page"].tolist(), signatures["is_photo"].tolist()
+        )
+    ]
+
+
+def signatures_from_list(items):
+    signatures = empty_signatures(len(items))
+    for i, item in enumerate(items):
+        signatures[i] = (item["page"], item["bbox"], item["type"], item.get("is_photo", False))
+    return signatures
+
+
+def pixel_to_page(boxes, scale, origin=(0.0, 0.0)):
+    """
+    N x 4 pixel boxes (x, y, w, h) at scale pixels per point, relative to origin (the page-space
+    top-left of the rendered clip) -> N x 4 float page boxes (x0, y0, x1, y1).
+    """
+    boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    page = np.empty_like(boxes)
+    page[:, :2] = boxes[:, :2] / scale + origin
+    page[:, 2:] = (boxes[:, :2] + boxes[:, 2:]) / scale + origin
+    return page
+
+
+def expand_boxes(boxes, margin):
+    """N x 4 page boxes grown by margin on every side, clamped at the page origin."""
+    grown = np.asarray(boxes, dtype=np.float64).reshape(-1, 4) + (-margin, -margin, margin, margin)
+    grown[:, :2] = np.maximum(grown[:, :2], 0)
+    return grown
+
+
+class Words:
+    """
+    Words of one clip, from the text layer or OCR, in reading order.
+    - text: list of str; boxes: N x 4 float64 (x0, y0, x1, y1, page coordinates); conf: float32.
+    """
+
+    __slots__ = ("text", "boxes", "conf")
+
+    def __init__(self, text, boxes, conf):
+        self.text = list(text)
+        self.boxes = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+        self.conf = np.asarray(conf, dtype=np.float32)
+
+    @classmethod
+    def empty(cls):
+        return cls([], np.empty((0, 4)), [])
+
+    @classmethod
+    def from_text_layer(cls, words):
+        """From page.get_text("words") tuples (x0, y0, x1, y1, text, block, line, word)."""
+        if not words:
+            return cls.empty()
+        return cls([w[4] for w in words], [w[:4] for w in words], np.full(len(words), 100.0))
+
+    @classmethod
+    def from_tesseract(cls, data, scale, origin=(0.0, 0.0)):
+        """From pytesseract Output.DICT (pixels of a crop), converted to page coordinates in one step."""
+        pixels = np.column_stack([data["left"], data["top"], data["width"], data["height"]]) if data["text"] else np.empty((0, 4))
+        return cls(data["text"], pixel_to_page(pixels, scale, origin), np.asarray(data["conf"], dtype=np.float32))
+
+    def __len__(self):
+        return len(self.text)
+
+    def take(self, indices):
+        indices = np.asarray(indices, dtype=np.intp)
+        return Words([self.text[i] for i in indices.tolist()], self.boxes[indices], self.conf[indices])
+
+    def inside(self, rect):
+        """Words whose centers fall inside rect (x0, y0, x1, y1), order preserved."""
+        cx = (self.boxes[:, 0] + self.boxes[:, 2]) / 2
+        cy = (self.boxes[:, 1] + self.boxes[:, 3]) / 2
+        x0, y0, x1, y1 = rect
+        return self.take(np.flatnonzero((cx >= x0) & (cx < x1) & (cy >= y0) & (cy < y1)))
+
+    def mean_confidence(self):
+        # Tesseract marks non-word rows with conf -1 (and empty rows 0)
+        scored = self.conf[self.conf > 0]
+        return float(scored.mean()) if scored.size else 0.0
+
+
+class Entity:
+    """One named entity to redact: spaCy label, its text and its page-space rect."""
+
+    __slots__ = ("label", "text", "rect")
+
+    def __init__(self, label, text, rect):
+        self.label = label
+        self.text = text
+        self.rect = tuple(float(v) for v in rect)
+
+    def to_dict(self):
+        return {"label": self.label, "text": self.text, "rect": list(self.rect)}
+
+    @classmethod
+    def from_dict(cls, item):
+        return cls(item["label"], item["text"], item["rect"])
+
+
+class Analysis:
+    """Text analysis of one signature: the semantically filtered text and its entities."""
+
+    __slots__ = ("text", "entities")
+
+    def __init__(self, text, entities=()):
+        self.text = text
+        self.entities = list(entities)
+
+    def to_dict(self):
+        return {"text": self.text, "entities": [entity.to_dict() for entity in self.entities]}
+
+    @classmethod
+    def from_dict(cls, item):
+        return cls(item["text"], [Entity.from_dict(entity) for entity in item["entities"]])
@@ -0,0 +1,117 @@
+# backend/models/registry.py
+import os
+import time
+import threading
+
+# Central, lazily loaded model registry. Nothing heavy is imported until a model is
+# first needed, and each model is loaded once per process. Loading before gunicorn
+# forks (preload_app + warm_up) shares the weights copy-on-write across workers.
+SPACY_MODEL = os.environ.get("SIGSECURE_SPACY_MODEL", "en_core_web_sm")
+BERT_MODEL = os.environ.get("SIGSECURE_BERT_MODEL", "all-MiniLM-L6-v2")
+# Only sentence boundaries (parser) and NER are used; skip the rest of the pipeline
+SPACY_EXCLUDE = ["tagger", "attribute_ruler", "lemmatizer"]
+# Semantic filter inference backend:
+# - "torch": fp32 PyTorch (reference)
+# - "int8": PyTorch with dynamic int8 quantization of the Linear layers
+# - "onnx": ONNX Runtime (optional, pip install "optimum[onnxruntime]"); SIGSECURE_BERT_ONNX_FILE
+#   picks a file from the model repo, e.g. onnx/model_quint8_avx2.onnx for quantized weights
+# Check a cheaper backend against "torch" with scripts/check_semantic_backend.py first.
+BERT_BACKENDS = ("torch", "int8", "onnx")
+BERT_BACKEND = os.environ.get("SIGSECURE_BERT_BACKEND", "torch")
+BERT_ONNX_FILE = os.environ.get("SIGSECURE_BERT_ONNX_FILE", "")
+# Intra-op threads per process for inference (0: library default, one per core).
+# Keep workers x threads <= cores; gunicorn.conf.py defaults each worker to 1.
+BERT_THREADS = int(os.environ.get("SIGSECURE_BERT_THREADS", 0))
+# Inference parallelism comes from the executors in models.inference, not torch's inter-op pool
+TORCH_INTEROP_THREADS = int(os.environ.get("SIGSECURE_TORCH_INTEROP_THREADS", 1))
+if BERT_THREADS:
+    # OpenMP/MKL size their pools when torch is first imported, so set them before that
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ.setdefault(var, str(BERT_THREADS))
+
+_models = {}
+_lock = threading.Lock()
+load_seconds = {}  # model name -> seconds spent loading it in this process
+
+
+def _load(name, loader):
+    if name not in _models:
+        with _lock:
+            if name not in _models:
+                start = time.perf_counter()
+                _models[name] = loader()
+                load_seconds[name] = round(time.perf_counter() - start, 3)
+                print(f"Loaded {name} in {load_seconds[name]}s (pid {os.getpid()})")
+    return _models[name]
+
+
+def get_nlp():
+    """spaCy pipeline for sentence splitting + NER."""
+    def loader():
+        import spacy
+        return spacy.load(SPACY_MODEL, exclude=SPACY_EXCLUDE)
+    return _load("spacy", loader)
+
+
+def load_bert_model(backend=BERT_BACKEND, threads=BERT_THREADS):
+    """
+    Loads the Sentence-BERT model on CPU with the given inference backend (not cached;
+    get_bert_model() is the shared instance).
+    - threads: intra-op threads, 0 for the library default (torch's setting is process-wide).
+    """
+    if backend not in BERT_BACKENDS:
+        raise ValueError(f"Unknown SIGSECURE_BERT_BACKEND {backend!r}; expected one of {', '.join(BERT_BACKENDS)}")
+    from sentence_transformers import SentenceTransformer
+    if backend == "onnx":
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise RuntimeError('The onnx backend needs ONNX Runtime: pip install "optimum[onnxruntime]"') from e
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        model_kwargs = {"session_options": options, "provider": "CPUExecutionProvider"}
+        if BERT_ONNX_FILE:
+            model_kwargs["file_name"] = BERT_ONNX_FILE
+        return SentenceTransformer(BERT_MODEL, device="cpu", backend="onnx", model_kwargs=model_kwargs)
+    import torch
+    if threads:
+        torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(TORCH_INTEROP_THREADS)
+    except RuntimeError:
+        pass  # Only settable before torch's first parallel work; keep what is there
+    model = SentenceTransformer(BERT_MODEL, device="cpu")
+    if backend == "int8":
+        # Weights stored as int8, activations quantized on the fly; only Linear layers change
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+
+def get_bert_model():
+    """Sentence-BERT model used by the semantic filter (SIGSECURE_BERT_BACKEND)."""
+    name = "sentence_bert"
+    if BERT_BACKEND == "onnx":
+        # ONNX Runtime thread pools do not survive fork: each process opens its own session
+        name = f"sentence_bert_onnx@{os.getpid()}"
+    return _load(name, load_bert_model)
+
+
+def warm_up():
+    """
+    Loads every model and runs one tiny inference so the first request does not pay
+    for lazy initialisation. Call before forking workers to share the memory.
+    """
+    start = time.perf_counter()
+    get_nlp()("Warm up sentence.")
+    # ONNX sessions are opened after fork, once per process (see get_bert_model)
+    if BERT_BACKEND != "onnx":
+        get_bert_model().encode(["warm up"])
+        from models import semantic  # Imported here: semantic depends on this module
+        semantic.warm_up()
+    load_seconds["warm_up_total"] = round(time.perf_counter() - start, 3)
+    return dict(load_seconds)
+
+
+def loaded():
+    return sorted(_models)
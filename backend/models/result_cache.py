@@ -0,0 +1,169 @@
+# backend/models/result_cache.py
+import os
+import json
+import shutil
+import hashlib
+import threading
+from pathlib import Path
+from models.records import Analysis, signatures_to_list, signatures_from_list
+from models.document_session import RENDER_DPI
+from models import signature_detect, page_filter, ocr_prep
+
+# Bump whenever a code change alters detection/analysis output for the same settings,
+# so stale entries are not reused (2: contour merge, page pre-filter, coarse pass)
+CACHE_VERSION = 2
+
+
+def file_digest(path):
+    """SHA-256 hex digest of a file, read in chunks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def bytes_digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def pipeline_settings():
+    """Environment settings that change detection or text analysis output (read at call time)."""
+    settings = {
+        "render_dpi": RENDER_DPI,
+        "coarse_dpi": signature_detect.COARSE_DPI,
+        "prefilter": page_filter.PREFILTER,
+        "prefilter_ink": page_filter.MIN_INK_DENSITY,
+        "ocr_adaptive": ocr_prep.ADAPTIVE,
+    }
+    if ocr_prep.ADAPTIVE:
+        settings.update(ocr_noise=ocr_prep.NOISE_THRESHOLD, ocr_contrast=ocr_prep.LOW_CONTRAST,
+                        ocr_lang=ocr_prep.OCR_LANG, ocr_psm=ocr_prep.OCR_PSM)
+    return settings
+
+
+def settings_key(settings=None):
+    # privacy_mode / redaction_style / highlight_only + pipeline settings -> short stable key
+    raw = json.dumps({**(settings or {}), "pipeline": pipeline_settings()}, sort_keys=True)
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+class ResultCache:
+    """
+    Two-level on-disk cache keyed by the SHA-256 of the PDF bytes.
+    - analysis/<digest>.json: signatures + per-signature analyses (text, entity boxes).
+      Independent of the redaction settings, so changing them only redoes the cheap
+      redaction step; keyed by the detection/OCR settings (pipeline_settings).
+    - output/<digest>_<settings>.pdf (+ .json): the redacted PDF, its signatures and entity counts.
+      Keyed by the same variant as the analysis it was built from, so anchor or
+      backend changes never serve an output redacted under the old ones.
+    Entries are evicted least-recently-used (by mtime, refreshed on hit) once the
+    total size exceeds max_bytes.
+    """
+
+    def __init__(self, root, max_bytes):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        (self.root / "analysis").mkdir(parents=True, exist_ok=True)
+        (self.root / "output").mkdir(parents=True, exist_ok=True)
+        self.hits = {"analysis": 0, "output": 0}
+        self.misses = {"analysis": 0, "output": 0}
+
+    def _analysis_path(self, digest, variant):
+        suffix = f"_{variant}" if variant else ""
+        return self.root / "analysis" / f"v{CACHE_VERSION}_{digest}_{settings_key()}{suffix}.json"
+
+    def _output_paths(self, digest, settings, variant):
+        suffix = f"_{variant}" if variant else ""
+        stem = f"v{CACHE_VERSION}_{digest}_{settings_key(settings)}{suffix}"
+        return self.root / "output" / f"{stem}.pdf", self.root / "output" / f"{stem}.json"
+
+    def _touch(self, *paths):
+        for path in paths:
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                pass
+
+    def _write_atomic(self, path, write):
+        tmp = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        write(tmp)
+        os.replace(tmp, path)
+
+    def get_analysis(self, digest, variant=""):
+        """Returns (signatures, analyses) or None. variant: e.g. the semantic anchor-set key."""
+        path = self._analysis_path(digest, variant)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.misses["analysis"] += 1
+            return None
+        self._touch(path)
+        self.hits["analysis"] += 1
+        return signatures_from_list(entry["signatures"]), [Analysis.from_dict(item) for item in entry["analyses"]]
+
+    def put_analysis(self, digest, signatures, analyses, variant=""):
+        path = self._analysis_path(digest, variant)
+        payload = json.dumps({"signatures": signatures_to_list(signatures), "analyses": [analysis.to_dict() for analysis in analyses]})
+        self._write_atomic(path, lambda tmp: tmp.write_text(payload, encoding="utf-8"))
+        self._evict()
+
+    def get_output(self, digest, settings, variant=""):
+        """Returns (cached_pdf_path, signatures, entities_detected) or None. variant: as for get_analysis."""
+        pdf_path, meta_path = self._output_paths(digest, settings, variant)
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.misses["output"] += 1
+            return None
+        if not pdf_path.exists():
+            self.misses["output"] += 1
+            return None
+        self._touch(pdf_path, meta_path)
+        self.hits["output"] += 1
+        return pdf_path, signatures_from_list(meta["signatures"]), meta["entities_detected"]
+
+    def put_output(self, digest, settings, output_file, signatures, entities_detected, variant=""):
+        """output_file: path of the redacted PDF, or a seekable binary file object holding it."""
+        pdf_path, meta_path = self._output_paths(digest, settings, variant)
+        if hasattr(output_file, "read"):
+            def write(tmp):
+                position = output_file.tell()
+                output_file.seek(0)
+                with open(tmp, "wb") as f:
+                    shutil.copyfileobj(output_file, f)
+                output_file.seek(position)
+            self._write_atomic(pdf_path, write)
+        else:
+            self._write_atomic(pdf_path, lambda tmp: shutil.copyfile(output_file, tmp))
+        payload = json.dumps({"settings": settings, "signatures": signatures_to_list(signatures), "entities_detected": entities_detected})
+        self._write_atomic(meta_path, lambda tmp: tmp.write_text(payload, encoding="utf-8"))
+        self._evict()
+
+    def _evict(self):
+        # LRU by mtime: drop oldest entries until the cache fits in max_bytes
+        with self._lock:
+            files = []
+            for path in self.root.glob("*/*"):
+                if path.name.startswith("."):
+                    continue  # In-flight atomic write
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    path.unlink()
+                    total -= size
+                except FileNotFoundError:
+                    pass
+
+    def stats(self):
+        return {"hits": dict(self.hits), "misses": dict(self.misses)}
@@ -0,0 +1,119 @@
+# backend/models/semantic.py
+import os
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from models.registry import BERT_MODEL, BERT_BACKEND, BERT_ONNX_FILE
+from models.inference import encode, encode_inline  # Shared, micro-batching Sentence-BERT executor
+from models.metrics import span
+
+EMBED_CACHE_SIZE = int(os.environ.get("SIGSECURE_EMBED_CACHE_SIZE", 10000))
+SIMILARITY_THRESHOLD = 0.2  # Sentences scoring above this are kept for NER
+
+# Context phrases the semantic filter compares sentences against, per privacy mode.
+# A sentence's score is its best cosine similarity over the mode's anchors.
+# Override with SIGSECURE_ANCHORS='{"medical": ["patient name", "signer name"]}'.
+DEFAULT_ANCHORS = ["signer name"]
+ANCHORS = {mode: list(DEFAULT_ANCHORS) for mode in ("none", "signer", "witness", "medical")}
+ANCHORS.update(json.loads(os.environ.get("SIGSECURE_ANCHORS", "{}")))
+
+
+def anchors_for(privacy_mode):
+    return ANCHORS.get(privacy_mode, DEFAULT_ANCHORS)
+
+
+def anchor_key(privacy_mode):
+    """
+    Short key for the semantic filter of a mode: its anchors plus the model and inference
+    backend, so cached analyses from another backend are never reused.
+    """
+    parts = anchors_for(privacy_mode) + [BERT_MODEL, BERT_BACKEND, BERT_ONNX_FILE]
+    return hashlib.sha256("\n".join(parts).encode()).hexdigest()[:12]
+
+
+def normalize_sentence(text):
+    return re.sub(r"\s+", " ", text).strip().lower()
+
+
+class EmbeddingCache:
+    """Bounded LRU of normalized sentence -> unit embedding, with hit/miss counters."""
+
+    def __init__(self, max_size=EMBED_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def embed(self, sentences):
+        """Unit embeddings (len(sentences) x dim); only unseen sentences are encoded, in one batch."""
+        keys = [normalize_sentence(s) for s in sentences]
+        found = {}
+        with self._lock:
+            for key in keys:
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    found[key] = self._entries[key]
+        missing = list(dict.fromkeys(key for key in keys if key not in found))
+        # A miss is a sentence that has to be encoded; repeats within a call count as hits
+        with self._lock:
+            self.misses += len(missing)
+            self.hits += len(keys) - len(missing)
+        if missing:
+            with span("bert_encode"):
+                vectors = encode(missing)
+            with self._lock:
+                for key, vector in zip(missing, vectors):
+                    found[key] = vector
+                    self._entries[key] = vector
+                    self._entries.move_to_end(key)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return np.stack([found[key] for key in keys])
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+embedding_cache = EmbeddingCache()
+_anchor_embeddings = {}  # anchor_key -> (n_anchors x dim) unit embeddings
+_anchor_lock = threading.Lock()
+
+
+def anchor_embeddings(privacy_mode):
+    """Anchor embeddings for a mode, encoded once per process."""
+    key = anchor_key(privacy_mode)
+    if key not in _anchor_embeddings:
+        with _anchor_lock:
+            if key not in _anchor_embeddings:
+                _anchor_embeddings[key] = encode(anchors_for(privacy_mode))
+    return _anchor_embeddings[key]
+
+
+def sentence_similarities(sentences, privacy_mode="none"):
+    """Best cosine similarity of each sentence to the mode's anchors."""
+    if not sentences:
+        return []
+    anchors = anchor_embeddings(privacy_mode)
+    return (embedding_cache.embed(sentences) @ anchors.T).max(axis=1).tolist()
+
+
+def warm_up():
+    # Encode every configured anchor set up front (called from registry warm-up). Runs in
+    # this thread, not the executor: warm-up comes before forking, and no thread may be
+    # running when a process forks.
+    with _anchor_lock:
+        for mode in ANCHORS:
+            key = anchor_key(mode)
+            if key not in _anchor_embeddings:
+                _anchor_embeddings[key] = encode_inline(anchors_for(mode))
@@ -1,83 +1,265 @@
 # backend/models/signature_detect.py
+import os
+import threading
 import fitz  # PyMuPDF
 import cv2
 import numpy as np
-from pathlib import Path
-import spacy  # For text context
-from scipy.spatial.distance import cdist  # For merging contours
+from scipy.spatial import cKDTree  # For merging contours
+from models.document_session import open_session
+from models.parallel import map_pages, pool_workers
+from models.text_source import merge_rects, native_words, TEXT_MARGIN
+from models.page_filter import screen_pages
+from models.records import empty_signatures, concat_signatures, pixel_to_page, expand_boxes
+from models.metrics import span, pages_total
 
-# Load spaCy model
-nlp = spacy.load("en_core_web_sm")
+MIN_CONTOUR_AREA = 1000  # Increased to reduce over-detection
+MERGE_DISTANCE = 100  # Merge if centers <100px apart
+INK_THRESHOLD = 150  # Fine pass: darker pixels are ink
+# Coarse pass: low-DPI grayscale render used only to find candidate regions, with
+# relaxed size limits. Downsampling averages a thin stroke with the paper around it,
+# so its ink threshold is lighter the lower the DPI (see coarse_ink_threshold).
+# SIGSECURE_COARSE_DPI=0 skips it: every page gets the fine pass over the whole page.
+COARSE_DPI = int(os.environ.get("SIGSECURE_COARSE_DPI", 50))
+COARSE_SLACK = 0.5
 
-def detect_signatures(file_path):
+_buffers = threading.local()  # Scratch threshold/dilate buffers, reused across pages
+
+
+def contour_boxes(contours, min_area=MIN_CONTOUR_AREA):
+    """Bounding boxes (N x 4 int array of x, y, w, h) of contours with area > min_area."""
+    if not contours:
+        return np.empty((0, 4), dtype=np.int64)
+    boxes = np.array([cv2.boundingRect(c) for c in contours], dtype=np.int64)
+    # A contour's area never exceeds its bounding box, so only big-enough boxes need contourArea
+    candidates = np.flatnonzero(boxes[:, 2] * boxes[:, 3] > min_area)
+    areas = np.array([cv2.contourArea(contours[i]) for i in candidates])
+    return boxes[candidates[areas > min_area]] if len(candidates) else boxes[:0]
+
+
+def merge_boxes(boxes, max_dist=MERGE_DISTANCE):
+    """
+    Greedy single-pass grouping: in order, each box not yet absorbed starts a group with
+    every later box whose center is closer than max_dist to its own. Groups do not chain
+    (a neighbour's neighbours are not pulled in); this is the grouping detection was
+    tuned with.
+    - Neighbour pairs come from a KD-tree, so cost grows with the number of close pairs
+      rather than with N^2.
+    Returns: M x 4 int array of merged (x, y, w, h).
+    """
+    if len(boxes) == 0:
+        return boxes
+    x0, y0 = boxes[:, 0], boxes[:, 1]
+    x1, y1 = x0 + boxes[:, 2], y0 + boxes[:, 3]
+    centers = np.column_stack(((x0 + x1) / 2, (y0 + y1) / 2))
+    pairs = cKDTree(centers).query_pairs(r=np.nextafter(max_dist, 0), output_type='ndarray')  # i < j
+    n = len(boxes)
+    # Later neighbours of each box, CSR-style
+    pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(pairs[:, 0], minlength=n))))
+    later = pairs[:, 1]
+    visited = np.zeros(n, dtype=bool)
+    members, starts = [], []
+    offset = 0
+    for i in range(n):
+        if visited[i]:
+            continue
+        group = later[indptr[i]:indptr[i + 1]]
+        visited[group] = True
+        starts.append(offset)
+        members.append(np.concatenate(([i], group)))
+        offset += len(group) + 1
+    members = np.concatenate(members)
+    starts = np.array(starts)
+    # Group extents with one reduceat per edge
+    gx0 = np.minimum.reduceat(x0[members], starts)
+    gy0 = np.minimum.reduceat(y0[members], starts)
+    gx1 = np.maximum.reduceat(x1[members], starts)
+    gy1 = np.maximum.reduceat(y1[members], starts)
+    return np.column_stack((gx0, gy0, gx1 - gx0, gy1 - gy0))
+
+
+def filter_signature_boxes(merged, page_height):
+    """Vectorized size/position filter over merged boxes."""
+    w, h, y = merged[:, 2], merged[:, 3], merged[:, 1]
+    keep = (w > 150) & (h > 40)  # Increased min size for signatures; avoids thin lines
+    keep &= y >= page_height * 0.1  # Ignore top 10% of page (headers)
+    return merged[keep]
+
+
+def _scratch(name, shape):
+    """
+    Per-thread uint8 buffer reused across pages; grows to the largest shape seen.
+    Returns (contiguous view of the requested shape, bytes held by the buffer).
+    """
+    size = shape[0] * shape[1]
+    buffers = _buffers.__dict__
+    if name not in buffers or buffers[name].size < size:
+        buffers[name] = np.empty(size, dtype=np.uint8)
+    return buffers[name][:size].reshape(shape), buffers[name].nbytes
+
+
+def _ink_boxes(gray, threshold, kernel, min_area, prefix, page_num=None):
+    # Threshold + dilate into reused buffers, then contour boxes (x, y, w, h) in gray's pixels
+    thresh, held = _scratch(prefix + "_thresh", gray.shape)
+    dilated, held2 = _scratch(prefix + "_dilated", gray.shape)
+    with span("threshold", page_num):
+        cv2.threshold(gray, threshold, 255, cv2.THRESH_BINARY_INV, dst=thresh)
+        cv2.dilate(thresh, kernel, dst=dilated, iterations=1)  # Connect disconnected strokes
+    with span("contours", page_num):
+        contours, _ = cv2.findContours(dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        boxes = contour_boxes(contours, min_area)
+    return boxes, held + held2
+
+
+def _render_gray(page, dpi, clip=None):
+    # Coarse pass: single-channel render straight from MuPDF (no RGB copy + cvtColor)
+    with span("rasterize", page.number):
+        pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, clip=clip, alpha=False)
+    gray = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.stride)[:, :pix.width]
+    return pix, gray
+
+
+def _render_region(page, dpi, clip):
+    """
+    Fine pass: RGB render of the clip converted with OpenCV into a reused gray buffer
+    (MuPDF's own gray conversion of color images differs, which would shift the 150 threshold).
+    Returns (gray view, (x, y) pixel origin on the page at dpi, bytes used).
+    """
+    with span("rasterize", page.number):
+        pix = page.get_pixmap(dpi=dpi, clip=clip, alpha=False)
+        rgb = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+        gray, held = _scratch("fine_gray", rgb.shape[:2])
+        cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY, dst=gray)
+    return gray, (pix.x, pix.y), pix.samples_mv.nbytes + held
+
+
+def _crop_region(session, page_num, clip):
+    # Fine pass from the session's page raster (same DPI): the crop is a view, nothing is rendered
+    rgb, origin = session.crop(page_num, clip)
+    gray, held = _scratch("fine_gray", rgb.shape[:2])
+    cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY, dst=gray)
+    return gray, (int(round(origin[0] * session.scale)), int(round(origin[1] * session.scale))), held
+
+
+def _needs_ocr(page, boxes):
+    # True when the text around any box (page coordinates) will be read by OCR, which
+    # crops the full page raster
+    clips = expand_boxes(boxes, TEXT_MARGIN).tolist()
+    return any(native_words(page, fitz.Rect(clip) & page.rect) is None for clip in clips)
+
+
+def coarse_ink_threshold(ratio):
+    """
+    Coarse ink threshold for `ratio` coarse pixels per fine pixel: a one-pixel fine stroke
+    just dark enough for INK_THRESHOLD, split across two coarse pixels, still counts.
+    """
+    return 255 - (255 - INK_THRESHOLD) * ratio / 2
+
+
+def candidate_regions(page, fine_scale):
+    """
+    Coarse pass: page rendered in grayscale at COARSE_DPI; ink regions that could hold
+    a signature once seen at full resolution (limits relaxed by COARSE_SLACK).
+    Returns ([fitz.Rect in page coordinates], bytes used).
+    """
+    ratio = COARSE_DPI / 72.0 / fine_scale  # Coarse pixels per fine pixel
+    pix, gray = _render_gray(page, COARSE_DPI)
+    k = max(3, int(round(5 * ratio)) | 1)
+    min_area = MIN_CONTOUR_AREA * ratio * ratio * COARSE_SLACK
+    boxes, held = _ink_boxes(gray, coarse_ink_threshold(ratio), np.ones((k, k), np.uint8), min_area, "coarse", page.number)
+    with span("merge", page.number):
+        merged = merge_boxes(boxes, MERGE_DISTANCE * ratio)
+    keep = (merged[:, 2] > 150 * ratio * COARSE_SLACK) & (merged[:, 3] > 40 * ratio * COARSE_SLACK)
+    # Margin: full-resolution neighbours up to MERGE_DISTANCE away must land in the same region
+    to_page = 72.0 / COARSE_DPI
+    margin = MERGE_DISTANCE / fine_scale
+    regions = [
+        fitz.Rect(x * to_page - margin, y * to_page - margin, (x + w) * to_page + margin, (y + h) * to_page + margin) & page.rect
+        for x, y, w, h in merged[keep].tolist()
+    ]
+    return [rect for rect, _ in merge_rects(regions)], pix.samples_mv.nbytes + held
+
+
+def detect_page_signatures(session, page_num):
+    """
+    Signature candidates on one 0-indexed page of a DocumentSession.
+    - Coarse-to-fine: a low-DPI grayscale pass finds candidate regions, and only those
+      are rendered at session.dpi, where the contour rules below apply unchanged. A page
+      where the coarse pass finds nothing gets the fine pass over the whole page.
+    - When the text around a candidate region will be OCRed (from the full page raster)
+      or the raster is already cached, fine regions are cut from session.raster instead
+      of rendered; the raster is kept only if a detected signature's text needs OCR.
+    - Peak bytes of page buffers are recorded on the session (session.peak_bytes).
+    """
+    SCALE = session.scale  # Fine pass at 200 DPI for detection accuracy
+    page = session.page(page_num)
+    regions, coarse_bytes = candidate_regions(page, SCALE) if COARSE_DPI else ([], 0)
+    session.note_memory(coarse_bytes)
+    if not regions:
+        # The pre-filter let this page through; ink too faint for the coarse pass may still be there
+        regions = [page.rect]
+    cached = session.has_raster(page_num)
+    from_raster = bool(regions) and (cached or _needs_ocr(page, [tuple(region) for region in regions]))
+
+    # Fine pass: threshold/contours per region, boxes collected in full-page pixel coordinates
+    boxes = []
+    kernel = np.ones((5, 5), np.uint8)
+    for region in regions:
+        if from_raster:
+            gray, (px, py), render_bytes = _crop_region(session, page_num, region)
+        else:
+            gray, (px, py), render_bytes = _render_region(page, session.dpi, region)
+        height, width = gray.shape
+        region_boxes, held = _ink_boxes(gray, INK_THRESHOLD, kernel, MIN_CONTOUR_AREA, "fine", page_num)
+        session.note_memory(render_bytes + held)
+        # Ink cut by the region border belongs to something outside the candidate group
+        # (anything within merge range was grouped by the coarse pass); drop it unless
+        # the border is the page edge
+        x0, y0, w, h = region_boxes.T
+        cut = ((x0 == 0) & (region.x0 > page.rect.x0)) | ((y0 == 0) & (region.y0 > page.rect.y0))
+        cut |= ((x0 + w >= width) & (region.x1 < page.rect.x1)) | ((y0 + h >= height) & (region.y1 < page.rect.y1))
+        region_boxes = region_boxes[~cut]
+        region_boxes[:, :2] += (px, py)  # Region origin is in page pixels at this DPI
+        boxes.append(region_boxes)
+
+    # Merge close contours
+    if not boxes:
+        return empty_signatures()
+    with span("merge", page_num):
+        merged = merge_boxes(np.concatenate(boxes))
+    page_height = int(round(page.rect.height * SCALE))
+    kept = filter_signature_boxes(merged, page_height)
+    w, h = kept[:, 2], kept[:, 3]
+    signatures = empty_signatures(len(kept))
+    signatures["page"] = page_num + 1
+    signatures["bbox"] = pixel_to_page(kept, SCALE)
+    signatures["is_photo"] = (np.abs(w / h - 1) < 0.3) & (w * h > 50000)  # Flag as photo if near-square and large
+    # Extract nearby text for type classification (placeholder)
+    for i, expand_rect in enumerate(expand_boxes(signatures["bbox"], 100).tolist()):
+        nearby_text = page.get_text("text", clip=fitz.Rect(expand_rect)).lower()
+        signatures["type"][i] = "witness" if "witness" in nearby_text else "signer"
+    if from_raster and not cached and not _needs_ocr(page, signatures["bbox"]):
+        session.release(page_num)  # No OCR will crop it: keep the page's memory as before
+    return signatures
+
+
+def detect_signatures(source, workers=None):
+    """
+    Detects signature-like ink regions on every page.
+    - source: PDF path, PDF bytes, or a DocumentSession shared with the text pipeline.
+    - workers: process pool size for page-level parallelism (default SIGSECURE_WORKERS).
+    - Pages the pre-filter rules out are skipped (decisions in session.screening).
+    Returns: SIGNATURE_DTYPE array (bbox in page coordinates, type, page 1-indexed, is_photo).
+    """
+    session, owned = None, False
     try:
-        file_path = Path(file_path)
-        signatures = []
-        doc = fitz.open(file_path)
-        DPI = 200
-        SCALE = DPI / 72.0
-        
-        for page_num in range(len(doc)):
-            page = doc[page_num]
-            pix = page.get_pixmap(dpi=200)  # Higher DPI for better detection accuracy
-            # Convert pixmap to numpy array for OpenCV
-            img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
-            if pix.n == 4:  # Handle alpha channel if present
-                img = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
-            else:
-                img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
-            
-            # Convert to grayscale
-            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-            # Threshold to detect dark regions (signatures)
-            _, thresh = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY_INV)  # Adjust threshold as needed
-            
-            # Dilate to connect disconnected signature strokes
-            kernel = np.ones((5, 5), np.uint8)
-            thresh = cv2.dilate(thresh, kernel, iterations=1)
-            
-            # Find contours
-            contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            
-            # Merge close contours
-            if contours:
-                boxes = [cv2.boundingRect(c) for c in contours if cv2.contourArea(c) > 1000]  # Increased to reduce over-detection
-                if boxes:
-                    centers = [(x + w/2, y + h/2) for x,y,w,h in boxes]
-                    dists = cdist(centers, centers)
-                    merged = []
-                    visited = [False] * len(boxes)
-                    for i in range(len(boxes)):
-                        if not visited[i]:
-                            group = [i]
-                            for j in range(i+1, len(boxes)):
-                                if dists[i][j] < 100:  # Merge if centers <100px apart
-                                    group.append(j)
-                                    visited[j] = True
-                            # Merge group into one bbox
-                            gx = min(boxes[k][0] for k in group)
-                            gy = min(boxes[k][1] for k in group)
-                            gw = max(boxes[k][0] + boxes[k][2] for k in group) - gx
-                            gh = max(boxes[k][1] + boxes[k][3] for k in group) - gy
-                            merged.append((gx, gy, gw, gh))
-                    for x, y, w, h in merged:
-                        if w > 150 and h > 40:  # Increased min size for signatures; avoids thin lines
-                            # Ignore top 10% of page (headers)
-                            if y < pix.height * 0.1:
-                                continue
-                            # Extract nearby text for type classification (placeholder)
-                            expand_rect = fitz.Rect(max(0, x/SCALE-100), max(0, y/SCALE-100), (x+w)/SCALE+100, (y+h)/SCALE+100)
-                            nearby_text = page.get_text("text", clip=expand_rect).lower()
-                            sig_type = "witness" if "witness" in nearby_text else "signer"
-                            signatures.append({
-                                "bbox": [x / SCALE, y / SCALE, (x + w) / SCALE, (y + h) / SCALE],
-                                "type": sig_type,
-                                "page": page_num + 1,
-                                "is_photo": abs(w/h - 1) < 0.3 and w * h > 50000  # Flag as photo if near-square and large
-                            })
-        
-        doc.close()
-        return signatures  # Return list of dicts directly (adjusted to match main.py expectation)
-    
-    except Exception as e:
-        return []  # Return empty list on error; log if needed
\ No newline at end of file
+        session, owned = open_session(source)
+        pages = screen_pages(session)
+        pages_total.inc(amount=len(pages))
+        per_page = map_pages(session, detect_page_signatures, [(p, ()) for p in pages], pool_workers(len(pages), workers))
+        return concat_signatures([per_page[page_num] for page_num in pages])
+    except Exception:
+        return empty_signatures()  # Return no signatures on error; log if needed
+    finally:
+        if owned:
+            session.close()
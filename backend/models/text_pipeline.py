@@ -1,217 +1,261 @@
+import os
 import fitz  # PyMuPDF for PDF handling
-import pytesseract  # OCR
-from PIL import Image  # For image handling in OCR
-import spacy  # NER
 import cv2  # For blur and preprocessing
 import numpy as np  # For array handling
-from pathlib import Path
-from io import BytesIO
-from pytesseract import Output  # For detailed OCR data
-from sentence_transformers import SentenceTransformer, util  # For semantic linking
-import torch  # Required for sentence-transformers
-from datetime import datetime  # For timestamp in error logging
-import json  # For audit log
-from fuzzywuzzy import fuzz  # Added for fuzzy matching
+from models.document_session import open_session
+from models.text_source import words_for_signatures, merge_rects
+from models.word_index import WordIndex
+from models.records import Entity, Analysis
+from models.parallel import map_pages, pool_workers
+from models.inference import parse  # spaCy, run by the shared micro-batching executor
+from models.semantic import sentence_similarities, SIMILARITY_THRESHOLD  # Sentence-BERT filter with cached anchors/embeddings
+from models.metrics import span
 
-# Load spaCy model
-nlp = spacy.load("en_core_web_sm")
+# doc.save options. garbage=1 drops objects orphaned by apply_redactions (removed
+# images, fonts) so they do not stay in the file; 3-4 also merges duplicates (slower,
+# smaller). deflate recompresses streams. Incremental saves only append to the
+# original file, so they do not apply to a new output.
+SAVE_OPTIONS = {
+    "garbage": int(os.environ.get("SIGSECURE_SAVE_GARBAGE", 1)),
+    "deflate": os.environ.get("SIGSECURE_SAVE_DEFLATE", "0") == "1",
+}
 
-# Load Sentence-BERT model (run once)
-bert_model = SentenceTransformer('all-MiniLM-L6-v2')
 
-def detect_and_redact_text_near_signatures(input_file, sig_boxes, output_file, privacy_mode='none', redaction_style='black', highlight_only=False):
+def _sentence_spans(doc_text):
+    # (stripped sentence text, its start offset in the source text)
+    spans = []
+    for sent in doc_text.sents:
+        stripped = sent.text.strip()
+        if stripped:
+            spans.append((stripped, sent.start_char + len(sent.text) - len(sent.text.lstrip())))
+    return spans
+
+
+def _to_source_offset(segments, offset):
+    # segments: (offset in filtered text, offset in full text, length) per joined sentence
+    for text_start, source_start, length in reversed(segments):
+        if offset >= text_start:
+            return source_start + min(offset - text_start, length)
+    return None
+
+
+def entity_word_box(ent, segments, index):
     """
-    Detects and redacts text near signatures using OCR, NER, and Sentence-BERT.
-    - Extracts text near sig_boxes.
-    - Uses Sentence-BERT to filter signature-related text.
-    - Uses NER to identify names, dates, addresses, phones in filtered text.
-    - Redacts with black box, blur, or watermark based on redaction_style, or highlights with red outline if highlight_only=True.
-    - Handles photos in medical mode.
-    - Adds AI watermark to all outputs.
-    - Saves redacted or highlighted PDF to output_file.
-    Returns: redacted_path (str), entities_detected (dict: e.g., {"PERSON": 1, "DATE": 0, "GPE": 0})
+    Page-space bbox [x0, y0, x1, y1] of a spaCy entity.
+    The entity's character span in the filtered text is mapped back to the full text
+    and from there to word positions; token matching is the fallback.
     """
-    try:
-        input_path = Path(input_file)
-        output_path = Path(output_file)
-        doc = fitz.open(input_path)
-        entities_detected = {"PERSON": 0, "DATE": 0, "GPE": 0}  # Track by type
-        for sig in sig_boxes:
-            page_num = sig['page'] - 1  # 0-indexed
-            page = doc[page_num]
-            bbox = sig['bbox']  # [x1, y1, x2, y2]
-            # Expand bbox for context (to capture nearby text)
-            expand_px = 200
-            clip_rect = fitz.Rect(
-                max(0, bbox[0] - expand_px),
-                max(0, bbox[1] - expand_px),
-                bbox[2] + expand_px,
-                bbox[3] + expand_px
-            )
-            # Get higher-resolution pixmap for OCR
-            matrix = fitz.Matrix(2, 2)  # 2x zoom for accuracy
-            pix = page.get_pixmap(matrix=matrix, clip=clip_rect)
-            img_bytes = pix.tobytes("png")
-            img = Image.open(BytesIO(img_bytes))
-            # Preprocess image for better OCR: Convert to numpy array and enhance contrast
-            img_array = np.array(img)
-            img_array = cv2.convertScaleAbs(img_array, alpha=1.5, beta=50)  # Increase contrast
-            img = Image.fromarray(img_array)
-            # Perform OCR with detailed data
-            ocr_data = pytesseract.image_to_data(img, output_type=Output.DICT)
-            # Calculate average confidence (ignore -1 or 0 conf values which are non-text)
-            conf_scores = [c for c in ocr_data['conf'] if c > 0]
-            avg_conf = sum(conf_scores) / len(conf_scores) if conf_scores else 0
-            # If average confidence is low (<50), retry with denoising
-            if avg_conf < 50:
-                # Apply light Gaussian blur to denoise
-                img_array = cv2.GaussianBlur(img_array, (3, 3), 0)
-                img = Image.fromarray(img_array)
-                ocr_data = pytesseract.image_to_data(img, output_type=Output.DICT)
-            # Reconstruct full text and split into sentences using spaCy
-            full_text = ' '.join([word for word in ocr_data['text'] if word.strip()])
-            doc_text = nlp(full_text)
-            sentences = [sent.text.strip() for sent in doc_text.sents if sent.text.strip()]
-            linked_text = []
-            if sentences:
-                signature_context = "signer name"  # Context for BERT
-                embeddings = bert_model.encode(sentences + [signature_context], convert_to_tensor=True)
-                similarities = util.cos_sim(embeddings[:-1], embeddings[-1])
-                linked_indices = [i for i, sim in enumerate(similarities[0]) if sim > 0.2]
-                linked_text = [sentences[i] for i in linked_indices]
-            # Fallback: use all text if no linked text found
-            if not linked_text:
-                linked_text = sentences if sentences else [full_text]
-            # Run NER on filtered text
-            text = ' '.join(linked_text)
-            ner_doc = nlp(text)
-            # Redact (or highlight) signature based on privacy_mode and style
-            should_redact_sig = False
-            if privacy_mode == 'signer' and sig['type'] == 'signer':
-                should_redact_sig = True
-            elif privacy_mode == 'witness' and sig['type'] == 'witness':
-                should_redact_sig = True
-            elif privacy_mode == 'medical':
-                should_redact_sig = True  # Redact by default (patient/witness)
-                if "doctor" in text.lower() or "md" in text.lower():
-                    should_redact_sig = False  # Skip if doctor's info
-            if should_redact_sig:
-                sig_rect = fitz.Rect(bbox)  # Use the signature bbox
-                if highlight_only:
-                    # Highlight with red outline instead of redacting
-                    page.draw_rect(sig_rect, color=(1, 0, 0), width=2)  # Red stroke, no fill
-                else:
-                    if redaction_style == 'black':
-                        page.add_redact_annot(sig_rect, fill=(0, 0, 0))
-                    elif redaction_style == 'blur':
-                        try:
-                            # Get pixmap for the exact bbox region
-                            pix = page.get_pixmap(matrix=fitz.Matrix(1, 1), clip=sig_rect)
-                            img_array = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
-                            if pix.n == 4:
-                                img_array = cv2.cvtColor(img_array, cv2.COLOR_BGRA2BGR)
-                            else:
-                                img_array = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
-                            # Apply blur
-                            blurred = cv2.GaussianBlur(img_array, (15, 15), 5)
-                            pixmap = fitz.Pixmap(fitz.csRGB, fitz.Rect(0, 0, pix.width, pix.height))
-                            pixmap.set_rect(pixmap.irect, blurred.tobytes())
-                            page.insert_image(sig_rect, pixmap=pixmap)
-                        except Exception as e:
-                            page.add_redact_annot(sig_rect, fill=(0, 0, 0))  # Fallback to black
-                            continue  # Skip to next signature
-                    elif redaction_style == 'watermark':
-                        try:
-                            page.insert_text((sig_rect.x0, sig_rect.y0), "REDACTED", fontsize=12, color=(1, 1, 1), fill=(0, 0, 0))
-                        except Exception as e:
-                            page.add_redact_annot(sig_rect, fill=(0, 0, 0))  # Fallback to black
-                            continue  # Skip to next signature
-            # Redact (or highlight) photo placeholder in medical mode
-            if privacy_mode == 'medical' and sig.get('is_photo', False):
-                if highlight_only:
-                    page.draw_rect(sig_rect, color=(1, 0, 0), width=2)  # Highlight photo
-                else:
-                    page.add_redact_annot(sig_rect, text="ID PHOTO REDACTED", fill=(0, 0, 0), text_color=(1, 1, 1))
-            # Process entities for redaction (or highlighting)
+    start = _to_source_offset(segments, ent.start_char)
+    end = _to_source_offset(segments, ent.end_char - 1)
+    if start is not None and end is not None:
+        words = index.words_in_span(start, end + 1)
+        if words:
+            return index.box(words)
+    return index.box(index.match_tokens(ent.text))
+
+
+def analyze_signature_texts(word_sets, privacy_mode="none"):
+    """
+    Semantic filter + NER over the words around many signatures at once
+    (possibly from many documents), so the models run at efficient batch sizes.
+    - word_sets: list of records.Words in page coordinates (see text_source).
+    - privacy_mode: selects the semantic anchor phrases (see semantic.ANCHORS).
+    Returns: list of records.Analysis, aligned with word_sets.
+    """
+    # Index each word set once: full text with per-word character offsets
+    indexes = [WordIndex(words) for words in word_sets]
+    full_texts = [index.full_text for index in indexes]
+    # Split into sentences using spaCy, keeping each sentence's offset in the full text
+    with span("sentences"):
+        sentence_sets = [_sentence_spans(doc_text) for doc_text in parse(full_texts)]
+    # One encode call for every uncached sentence of every signature; anchors are precomputed
+    all_sentences = [sentence for sentences in sentence_sets for sentence, _ in sentences]
+    similarities = sentence_similarities(all_sentences, privacy_mode)
+    texts, segment_sets = [], []
+    offset = 0
+    for full_text, sentences in zip(full_texts, sentence_sets):
+        sims = similarities[offset:offset + len(sentences)]
+        offset += len(sentences)
+        linked_text = [span for span, sim in zip(sentences, sims) if sim > SIMILARITY_THRESHOLD]
+        # Fallback: use all text if no linked text found
+        if not linked_text:
+            linked_text = sentences if sentences else [(full_text, 0)]
+        segments, position = [], 0
+        for sentence, source_start in linked_text:
+            segments.append((position, source_start, len(sentence)))
+            position += len(sentence) + 1
+        texts.append(' '.join(sentence for sentence, _ in linked_text))
+        segment_sets.append(segments)
+    # Run NER on filtered text
+    with span("ner"):
+        ner_docs = parse(texts)
+    analyses = []
+    with span("entity_match"):
+        for index, segments, text, ner_doc in zip(indexes, segment_sets, texts, ner_docs):
+            entities = []
             for ent in ner_doc.ents:
                 if ent.label_ in ["PERSON", "DATE", "GPE"]:  # "PHONE" not standard; use "MISC" or custom if needed
                     # Skip header-like entities
                     if "page" in ent.text.lower() or "document" in ent.text.lower():
                         continue
-                    # Mode-dependent redaction for entities
-                    should_redact_ent = False
-                    if privacy_mode == 'none':
-                        should_redact_ent = False
-                    elif privacy_mode == 'signer' and sig['type'] == 'signer':
-                        should_redact_ent = True
-                    elif privacy_mode == 'witness' and sig['type'] == 'witness':
-                        should_redact_ent = True
-                    elif privacy_mode == 'medical':
-                        should_redact_ent = True
-                        if "doctor" in text.lower():
-                            should_redact_ent = False
-                    if should_redact_ent:
-                        # Find approximate bbox for entity
-                        ent_words = ent.text.split()
-                        ent_left, ent_top, ent_right, ent_bottom = float('inf'), float('inf'), 0, 0
-                        current_word_idx = 0
-                        for i in range(len(ocr_data['text'])):
-                            word = ocr_data['text'][i].strip()
-                            if word and current_word_idx < len(ent_words):
-                                # Fuzzy match with threshold (80% similarity)
-                                if fuzz.ratio(word.lower(), ent_words[current_word_idx].lower()) > 80:
-                                    left = ocr_data['left'][i]
-                                    top = ocr_data['top'][i]
-                                    width = ocr_data['width'][i]
-                                    height = ocr_data['height'][i]
-                                    ent_left = min(ent_left, left)
-                                    ent_top = min(ent_top, top)
-                                    ent_right = max(ent_right, left + width)
-                                    ent_bottom = max(ent_bottom, top + height)
-                                    current_word_idx += 1
-                                    if current_word_idx == len(ent_words):
-                                        break
-                        if ent_left != float('inf'):
-                            # Translate to page coordinates
-                            page_left = clip_rect.x0 + (ent_left / 2)
-                            page_top = clip_rect.y0 + (ent_top / 2)
-                            page_right = clip_rect.x0 + (ent_right / 2)
-                            page_bottom = clip_rect.y0 + (ent_bottom / 2)
-                            ent_rect = fitz.Rect(page_left, page_top, page_right, page_bottom)
-                            if highlight_only:
-                                # Highlight with red outline
-                                page.draw_rect(ent_rect, color=(1, 0, 0), width=2)  # Red stroke, no fill
-                            else:
-                                if redaction_style == 'black':
-                                    page.add_redact_annot(ent_rect, fill=(0, 0, 0))
-                                elif redaction_style == 'blur':
-                                    try:
-                                        pix = page.get_pixmap(matrix=fitz.Matrix(1, 1), clip=ent_rect)
-                                        img_array = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
-                                        if pix.n == 4:
-                                            img_array = cv2.cvtColor(img_array, cv2.COLOR_BGRA2BGR)
-                                        else:
-                                            img_array = cv2.cvtColor(img_array, cv2.COLOR_RGB2BGR)
-                                        blurred = cv2.GaussianBlur(img_array, (15, 15), 5)
-                                        pixmap = fitz.Pixmap(fitz.csRGB, fitz.Rect(0, 0, pix.width, pix.height))
-                                        pixmap.set_rect(pixmap.irect, blurred.tobytes())
-                                        page.insert_image(ent_rect, pixmap=pixmap)
-                                    except Exception as e:
-                                        page.add_redact_annot(ent_rect, fill=(0, 0, 0))  # Fallback to black
-                                        continue
-                                elif redaction_style == 'watermark':
-                                    try:
-                                        page.insert_text((ent_rect.x0, ent_rect.y0), "REDACTED", fontsize=12, color=(1, 1, 1), fill=(0, 0, 0))
-                                    except Exception as e:
-                                        page.add_redact_annot(ent_rect, fill=(0, 0, 0))  # Fallback to black
-                                        continue
-                            # Increment count for this entity type (only if redacted or highlighted)
-                            entities_detected[ent.label_] += 1
-            # Apply all redactions on this page ONLY if not highlight_only
-            if not highlight_only:
-                page.apply_redactions()
-        # Add AI watermark to all pages
-        watermark_text = "Privacy Protected by SigSecure AI"
+                    rect = entity_word_box(ent, segments, index)
+                    if rect is not None:
+                        entities.append(Entity(ent.label_, ent.text, rect))
+            analyses.append(Analysis(text, entities))
+    return analyses
+
+
+def analyze_page(session, page_num, page_sigs, privacy_mode="none"):
+    """Text analysis for the signatures of one 0-indexed page (runs in pool workers too)."""
+    # Read each merged page region once (text layer, or OCR for scanned regions)
+    # and attribute the words back to each signature's expanded clip
+    sig_words = words_for_signatures(session, page_sigs, expand=200)
+    return analyze_signature_texts([words for _, words, _ in sig_words], privacy_mode)
+
+
+def analyze_signatures(session, sig_boxes, workers=None, privacy_mode="none"):
+    """
+    Runs analyze_page for every page with signatures, in parallel when the document is long enough.
+    - sig_boxes: SIGNATURE_DTYPE array.
+    Returns: list of Analysis aligned with sig_boxes.
+    """
+    pages = sig_boxes['page']
+    page_args = [(int(page) - 1, (sig_boxes[pages == page], privacy_mode)) for page in np.unique(pages)]
+    per_page = map_pages(session, analyze_page, page_args, pool_workers(len(page_args), workers))
+    # Re-align with sig_boxes order
+    analyses = [None] * len(sig_boxes)
+    for page_num, results in per_page.items():
+        for idx, analysis in zip(np.flatnonzero(pages == page_num + 1).tolist(), results):
+            analyses[idx] = analysis
+    return analyses
+
+
+def _should_redact_sig(sig, text, privacy_mode):
+    if privacy_mode == 'signer':
+        return sig['type'] == 'signer'
+    if privacy_mode == 'witness':
+        return sig['type'] == 'witness'
+    if privacy_mode == 'medical':
+        # Redact by default (patient/witness); skip if doctor's info
+        return not ("doctor" in text.lower() or "md" in text.lower())
+    return False
+
+
+def _should_redact_ent(sig, text, privacy_mode):
+    if privacy_mode == 'signer':
+        return sig['type'] == 'signer'
+    if privacy_mode == 'witness':
+        return sig['type'] == 'witness'
+    if privacy_mode == 'medical':
+        return "doctor" not in text.lower()
+    return False
+
+
+def plan_redactions(sig_boxes, analyses, privacy_mode='none'):
+    """
+    Decides what to redact, without touching the document.
+    Returns: ({page_num: [(kind, fitz.Rect)]}, entities_detected), kind in
+    "signature", "photo", "entity". Entities seen through several signature clips appear once.
+    """
+    plans = {}
+    entities_detected = {"PERSON": 0, "DATE": 0, "GPE": 0}  # Track by type
+    redacted_ents = set()  # (page, rect) already handled via an overlapping signature clip
+    for sig, analysis in zip(sig_boxes, analyses):
+        page_num = int(sig['page']) - 1  # 0-indexed
+        items = plans.setdefault(page_num, [])
+        text = analysis.text
+        sig_rect = fitz.Rect(sig['bbox'].tolist())  # [x1, y1, x2, y2]
+        if _should_redact_sig(sig, text, privacy_mode):
+            items.append(("signature", sig_rect))
+        # Photo placeholder in medical mode
+        if privacy_mode == 'medical' and sig['is_photo']:
+            items.append(("photo", sig_rect))
+        if not _should_redact_ent(sig, text, privacy_mode):
+            continue
+        for ent in analysis.entities:
+            ent_rect = fitz.Rect(ent.rect)
+            ent_key = (page_num, tuple(round(v, 1) for v in ent_rect))
+            if ent_key in redacted_ents:
+                continue  # Same words seen through another signature's clip
+            redacted_ents.add(ent_key)
+            items.append(("entity", ent_rect))
+            entities_detected[ent.label] += 1
+    return {page_num: items for page_num, items in plans.items() if items}, entities_detected
+
+
+def blur_regions(page, rects, dpi=72):
+    """
+    Blurs every rect of a page in one render: the union of the (merged) rects is rendered
+    once, each region is blurred in place on that array, and the result is inserted as a
+    single image whose alpha mask is opaque only over the regions.
+    """
+    regions = [rect for rect, _ in merge_rects(rects)]
+    union = fitz.Rect(regions[0])
+    for rect in regions[1:]:
+        union |= rect
+    union &= page.rect
+    if union.is_empty:
+        return
+    with span("rasterize", page.number):
+        pix = page.get_pixmap(dpi=dpi, clip=union, alpha=False)
+    img = np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+    rgba = np.zeros((pix.height, pix.width, 4), dtype=np.uint8)
+    scale = dpi / 72.0
+    for rect in regions:
+        x0 = max(0, int((rect.x0 - union.x0) * scale))
+        y0 = max(0, int((rect.y0 - union.y0) * scale))
+        x1 = min(pix.width, int(np.ceil((rect.x1 - union.x0) * scale)))
+        y1 = min(pix.height, int(np.ceil((rect.y1 - union.y0) * scale)))
+        if x1 <= x0 or y1 <= y0:
+            continue
+        rgba[y0:y1, x0:x1, :3] = cv2.GaussianBlur(img[y0:y1, x0:x1, :3], (15, 15), 5)
+        rgba[y0:y1, x0:x1, 3] = 255
+    overlay = fitz.Pixmap(fitz.csRGB, pix.width, pix.height, rgba.tobytes(), True)
+    page.insert_image(union, pixmap=overlay)
+
+
+def redact_page(page, items, redaction_style='black', highlight_only=False):
+    """
+    Executes one page's plan: blur regions are rendered and inserted together, redaction
+    annotations are added, and apply_redactions runs once for the page.
+    """
+    page_num = page.number
+    if highlight_only:
+        # Highlight with red outline instead of redacting
+        for _, rect in items:
+            page.draw_rect(rect, color=(1, 0, 0), width=2)  # Red stroke, no fill
+        return
+    annotate = [(kind, rect) for kind, rect in items if kind == "photo" or redaction_style not in ('blur', 'watermark')]
+    styled = [rect for kind, rect in items if kind != "photo" and redaction_style in ('blur', 'watermark')]
+    if styled and redaction_style == 'blur':
+        try:
+            with span("redact_blur", page_num):
+                blur_regions(page, styled)
+        except Exception:
+            annotate.extend(("signature", rect) for rect in styled)  # Fallback to black
+    elif styled and redaction_style == 'watermark':
+        for rect in styled:
+            try:
+                page.insert_text((rect.x0, rect.y0), "REDACTED", fontsize=12, color=(1, 1, 1), fill=(0, 0, 0))
+            except Exception:
+                annotate.append(("signature", rect))  # Fallback to black
+    for kind, rect in annotate:
+        if kind == "photo":
+            page.add_redact_annot(rect, text="ID PHOTO REDACTED", fill=(0, 0, 0), text_color=(1, 1, 1))
+        else:
+            page.add_redact_annot(rect, fill=(0, 0, 0))
+    if annotate:
+        with span("redact_apply", page_num):
+            page.apply_redactions()
+
+
+def finish_document(doc, output_file, save_options=None):
+    """
+    Adds the AI watermark to every page and saves the document to output_file (a path,
+    or a writable binary file object) with save_options (default SAVE_OPTIONS).
+    """
+    watermark_text = "Privacy Protected by SigSecure AI"
+    with span("watermark"):
         for page in doc:
             page.insert_textbox(
                 fitz.Rect(page.rect.width - 200, page.rect.height - 20, page.rect.width, page.rect.height),  # Bottom-right
@@ -220,19 +264,51 @@ def detect_and_redact_text_near_signatures(input_file, sig_boxes, output_file, p
                 color=(0.5, 0.5, 0.5),  # Gray
                 overlay=True  # Place on top of content
             )
-        # Save the document (highlighted or redacted)
-        doc.save(output_path)
-        doc.close()
-        return str(output_path), entities_detected
+    # Save the document (highlighted or redacted)
+    options = save_options or SAVE_OPTIONS
+    with span("save"):
+        if hasattr(output_file, "write"):
+            # doc.save() would reopen a file object by its .name; serialise in memory instead
+            output_file.write(doc.tobytes(**options))
+        else:
+            doc.save(str(output_file), **options)
+
+
+def detect_and_redact_text_near_signatures(input_file, sig_boxes, output_file, privacy_mode='none', redaction_style='black', highlight_only=False, analyses=None, workers=None, save_options=None):
+    """
+    Detects and redacts text near signatures using OCR, NER, and Sentence-BERT.
+    - input_file: PDF path, PDF bytes, or the DocumentSession used by detect_signatures
+      (page rasters are then reused instead of rendered again).
+    - Extracts text near sig_boxes from the PDF text layer, or with OCR for scanned regions.
+    - Uses Sentence-BERT to filter signature-related text.
+    - Uses NER to identify names, dates, addresses, phones in filtered text.
+    - Redacts with black box, blur, or watermark based on redaction_style, or highlights with red outline if highlight_only=True.
+      Redactions are planned for the whole document first (plan_redactions), then executed
+      page by page (redact_page).
+    - Handles photos in medical mode.
+    - Adds AI watermark to all outputs.
+    - Saves redacted or highlighted PDF to output_file (a path, or a writable binary
+      file object such as a SpooledTemporaryFile) with save_options (default SAVE_OPTIONS).
+    - analyses: precomputed analyze_signatures() results (e.g. from pipeline.analyze_document); computed if None.
+    - workers: process pool size for page-level parallelism (default SIGSECURE_WORKERS).
+    Returns: redacted_path (str, or the file object), entities_detected (dict: e.g., {"PERSON": 1, "DATE": 0, "GPE": 0})
+    Raises RuntimeError if redaction fails.
+    """
+    try:
+        session, owned = open_session(input_file)
+        to_stream = hasattr(output_file, "write")
+        doc = session.doc
+        if analyses is None:
+            analyses = analyze_signatures(session, sig_boxes, workers, privacy_mode)
+        plans, entities_detected = plan_redactions(sig_boxes, analyses, privacy_mode)
+        for page_num in sorted(plans):
+            redact_page(doc[page_num], plans[page_num], redaction_style, highlight_only)
+        finish_document(doc, output_file, save_options)
+        if owned:
+            session.close()
+        return (output_file if to_stream else str(output_file)), entities_detected
     except Exception as e:
-        # Log error to audit_log.json
-        audit_log_path = Path(input_file).parent / 'audit_log.json'
-        error_entry = {
-            "timestamp": datetime.datetime.now().isoformat(),
-            "file": Path(input_file).name,
-            "error": f"Text pipeline failed: {str(e)}"
-        }
-        with open(audit_log_path, 'a') as f:
-            json.dump(error_entry, f)
-            f.write('\n')
-        return None, {"PERSON": 0, "DATE": 0, "GPE": 0}  # Return empty dict on error
\ No newline at end of file
+        # The caller records the failure in the audit log
+        if 'owned' in locals() and owned:
+            session.close()
+        raise RuntimeError(f"Text pipeline failed: {str(e)}") from e
\ No newline at end of file
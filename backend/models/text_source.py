@@ -0,0 +1,141 @@
+# backend/models/text_source.py
+import fitz  # PyMuPDF
+import pytesseract  # OCR fallback for scanned regions
+from PIL import Image
+from pytesseract import Output
+from models.metrics import span
+from models.ocr_prep import ADAPTIVE, enhance, soften, prepare, OCR_LANG, OCR_CONFIG
+from models.records import Words, expand_boxes
+
+MIN_TEXT_WORDS = 3  # Fewer native words than this in a clip means "no real text layer"
+MAX_IMAGE_COVERAGE = 0.5  # Clips mostly covered by images are treated as scanned
+TEXT_MARGIN = 200  # Points read around each signature for its nearby text
+# Below this mean confidence a clip is OCRed once more, denoised
+RETRY_CONFIDENCE = 50
+
+
+def _image_coverage(page, clip_rect):
+    # Fraction of the clip covered by embedded images (scans are one big image)
+    clip_area = clip_rect.get_area()
+    if clip_area <= 0:
+        return 0.0
+    covered = 0.0
+    for info in page.get_image_info():
+        overlap = fitz.Rect(info["bbox"]) & clip_rect
+        if not overlap.is_empty:
+            covered += overlap.get_area()
+    return min(1.0, covered / clip_area)
+
+
+def native_words(page, clip_rect):
+    """
+    Words from the PDF text layer inside clip_rect (page coordinates, conf=100).
+    Returns None when the clip has no usable text layer.
+    """
+    words = [w for w in page.get_text("words", clip=clip_rect) if w[4].strip()]
+    if len(words) < MIN_TEXT_WORDS or _image_coverage(page, clip_rect) > MAX_IMAGE_COVERAGE:
+        return None
+    # Keep reading order: block, line, word number
+    words.sort(key=lambda w: (w[5], w[6], w[7]))
+    return Words.from_text_layer(words)
+
+
+def _tesseract(image, session, crop_origin, factor=1.0, **settings):
+    data = pytesseract.image_to_data(Image.fromarray(image), output_type=Output.DICT, **settings)
+    # Pixels of the (possibly resized) crop -> page coordinates
+    return Words.from_tesseract(data, session.scale * factor, crop_origin)
+
+
+def _adaptive_ocr(crop, session, page_num, crop_origin):
+    # One preprocessing path and OCR resolution picked from the crop's noise, contrast
+    # and text height (see ocr_prep), so most clips need a single pass
+    settings = {"lang": OCR_LANG, "config": OCR_CONFIG}
+    with span("ocr_prep", page_num):
+        image, path, factor, _ = prepare(crop)
+    with span("ocr", page_num):
+        words = _tesseract(image, session, crop_origin, factor, **settings)
+    # Still low on a clip the measurements judged clean: retry once with denoising
+    if words.mean_confidence() < RETRY_CONFIDENCE and not path.startswith("denoise"):
+        with span("ocr_retry", page_num):
+            image, _, factor, _ = prepare(crop, "denoise_stretch" if path == "stretch" else "denoise")
+            retried = _tesseract(image, session, crop_origin, factor, **settings)
+        if retried.mean_confidence() > words.mean_confidence():
+            words = retried
+    return words
+
+
+def ocr_words(session, page_num, clip_rect, adaptive=None):
+    """
+    OCR the clip from the session's cached page raster. Returns Words with the pixel
+    boxes converted to page coordinates.
+    - adaptive: use ocr_prep's measured preprocessing path; SIGSECURE_OCR_ADAPTIVE when None.
+    """
+    crop, crop_origin = session.crop(page_num, clip_rect)
+    if ADAPTIVE if adaptive is None else adaptive:
+        return _adaptive_ocr(crop, session, page_num, crop_origin)
+    # Preprocess image for better OCR: enhance contrast
+    img_array = enhance(crop)
+    with span("ocr", page_num):
+        words = _tesseract(img_array, session, crop_origin)
+    # If average confidence (ignoring Tesseract's -1/0 non-word rows) is low, retry with denoising
+    if words.mean_confidence() < RETRY_CONFIDENCE:
+        with span("ocr_retry", page_num):
+            words = _tesseract(soften(img_array), session, crop_origin)
+    return words
+
+
+def get_words(session, page_num, clip_rect):
+    """
+    Returns (words, source): the text layer when the clip has real text, otherwise OCR.
+    source is "text_layer" or "ocr"; word boxes are always in page coordinates.
+    """
+    with span("text_layer", page_num):
+        words = native_words(session.page(page_num), clip_rect)
+    if words is not None:
+        return words, "text_layer"
+    return ocr_words(session, page_num, clip_rect), "ocr"
+
+
+def merge_rects(rects):
+    """
+    Unions overlapping rects until none overlap (transitively).
+    Returns: list of (fitz.Rect, [indices of the input rects it covers]).
+    """
+    merged = [(fitz.Rect(r), [i]) for i, r in enumerate(rects)]
+    changed = True
+    while changed:
+        changed = False
+        out = []
+        for rect, members in merged:
+            for i, (other, other_members) in enumerate(out):
+                if rect.intersects(other):
+                    out[i] = (other | rect, other_members + members)
+                    changed = True
+                    break
+            else:
+                out.append((rect, members))
+        merged = out
+    return merged
+
+
+def words_for_signatures(session, sig_boxes, expand=TEXT_MARGIN):
+    """
+    Extracts words once per merged page region instead of once per signature.
+    - Overlapping signature clips on a page are merged, and each merged region is read once.
+    - Each signature gets back the words whose centers fall inside its own clip.
+    - sig_boxes: SIGNATURE_DTYPE array.
+    Returns: list of (clip_rect, Words, source), aligned with sig_boxes.
+    """
+    # Expand each bbox for context (to capture nearby text)
+    clips = [fitz.Rect(clip) for clip in expand_boxes(sig_boxes["bbox"], expand).tolist()]
+    by_page = {}
+    for idx, page in enumerate(sig_boxes["page"].tolist()):
+        by_page.setdefault(page - 1, []).append(idx)
+    results = [None] * len(sig_boxes)
+    for page_num, sig_indices in by_page.items():
+        for region, members in merge_rects([clips[idx] for idx in sig_indices]):
+            words, source = get_words(session, page_num, region)
+            for member in members:
+                idx = sig_indices[member]
+                results[idx] = (clips[idx], words.inside(clips[idx]), source)
+    return results
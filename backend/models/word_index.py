@@ -0,0 +1,65 @@
+# backend/models/word_index.py
+from bisect import bisect_left, bisect_right
+from rapidfuzz import fuzz, process
+
+FUZZY_CUTOFF = 80  # Minimum fuzz.ratio for a fuzzy token match
+
+
+def normalize_token(token):
+    return token.strip().lower()
+
+
+class WordIndex:
+    """
+    Index over one Words set (records.Words), built once and shared by every entity.
+    - full_text is the space-joined non-empty words, with each word's character offset,
+      so a character span maps straight back to word positions (bisect).
+    - Normalized tokens are hashed for exact lookups; RapidFuzz handles fuzzy fallbacks.
+    """
+
+    def __init__(self, words):
+        self.words = words
+        self.positions = [i for i, word in enumerate(words.text) if word.strip()]
+        words = [words.text[i] for i in self.positions]
+        self.full_text = ' '.join(words)
+        self.starts = []
+        offset = 0
+        for word in words:
+            self.starts.append(offset)
+            offset += len(word) + 1
+        self.ends = [start + len(word) for start, word in zip(self.starts, words)]
+        self.tokens = [normalize_token(word) for word in words]
+        self.exact = {}
+        for k, token in enumerate(self.tokens):
+            self.exact.setdefault(token, []).append(k)
+
+    def words_in_span(self, start, end):
+        """Word numbers (into the non-empty words) overlapping full_text[start:end]."""
+        first = bisect_right(self.ends, start)
+        last = bisect_left(self.starts, end)
+        return list(range(first, last))
+
+    def match_tokens(self, ent_text):
+        """
+        Fallback when no character span is known: finds the entity's tokens in order,
+        exact hash hits first, then the best RapidFuzz match after the previous token.
+        """
+        matched = []
+        after = -1
+        for token in (normalize_token(t) for t in ent_text.split()):
+            hits = [k for k in self.exact.get(token, []) if k > after]
+            if not hits:
+                candidates = process.extract(token, self.tokens, scorer=fuzz.ratio, score_cutoff=FUZZY_CUTOFF, limit=None)
+                hits = sorted(k for _, score, k in candidates if score > FUZZY_CUTOFF and k > after)
+            if not hits:
+                continue
+            after = hits[0]
+            matched.append(after)
+        return matched
+
+    def box(self, word_numbers):
+        """Union [x0, y0, x1, y1] of the given words (page coordinates), or None."""
+        if not word_numbers:
+            return None
+        boxes = self.words.boxes[[self.positions[k] for k in word_numbers]]
+        return [*boxes[:, :2].min(axis=0).tolist(), *boxes[:, 2:].max(axis=0).tolist()]
@@ -4,10 +4,27 @@ import UploadForm from './components/UploadForm';
 import DocumentPreview from './components/DocumentPreview';
 import AuditLogs from './components/AuditLogs';
 import ErrorMessage from './components/ErrorMessage';
+import ProcessingProgress from './components/ProcessingProgress';
 import { Modal, Button } from 'react-bootstrap';
 import { FontAwesomeIcon } from '@fortawesome/react-fontawesome';
 import { faShieldAlt } from '@fortawesome/free-solid-svg-icons';
 import ClipLoader from 'react-spinners/ClipLoader';
+// Reads an NDJSON response line by line, calling onEvent for each parsed event as it arrives
+const readEvents = async (response, onEvent) => {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = '';
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffered += decoder.decode(value, { stream: true });
+    const lines = buffered.split('\n');
+    buffered = lines.pop();
+    lines.filter((line) => line.trim()).forEach((line) => onEvent(JSON.parse(line)));
+  }
+  if (buffered.trim()) onEvent(JSON.parse(buffered));
+};
+const pdfBlob = (base64) => new Blob([Uint8Array.from(atob(base64), (c) => c.charCodeAt(0))], { type: 'application/pdf' });
 function App() {
   const [file, setFile] = useState(null);
   const [previewUrl, setPreviewUrl] = useState(null);
@@ -20,6 +37,7 @@ function App() {
   const [error, setError] = useState(null);
   const [showSuccessModal, setShowSuccessModal] = useState(false);
   const [latestLog, setLatestLog] = useState(null);
+  const [progress, setProgress] = useState(null);
   const handleFileChange = (e) => {
     const selectedFile = e.target.files[0];
     if (selectedFile) {
@@ -43,19 +61,48 @@ function App() {
     formData.append('privacy_mode', privacyMode);
     formData.append('redaction_style', redactionStyle);
     formData.append('highlight_only', highlightOnly);
+    setProgress(null);
     try {
-      const response = await fetch('http://localhost:5000/api/upload', { method: 'POST', body: formData });
+      // Streaming endpoint: per-page events while the document is processed, then the PDF
+      const response = await fetch('http://localhost:5000/api/upload/stream', { method: 'POST', body: formData });
       if (response.ok) {
-        // Revoke previous preview URL to prevent memory leaks
-        if (previewUrl) URL.revokeObjectURL(previewUrl);
-        const blob = await response.blob();
-        setPreviewUrl(URL.createObjectURL(blob));
-        fetchLogs();
-        // Get the latest log
-        const newLogs = await (await fetch('http://localhost:5000/api/audit_log')).json();
-        const lastLog = newLogs[newLogs.length - 1];
-        setLatestLog(lastLog);
-        setShowSuccessModal(true);
+        let result = null;
+        let streamError = null;
+        await readEvents(response, (event) => {
+          if (event.event === 'start') {
+            const skipped = Object.keys(event.pages_skipped || {}).length;
+            setProgress({ pages: event.pages, scanned: event.pages_scanned, skipped, detected: 0, redacted: 0, redactTotal: 0, pageResults: [] });
+          } else if (event.event === 'page' && event.stage === 'detect') {
+            const seconds = Object.values(event.timings || {}).reduce((a, b) => a + b, 0);
+            setProgress((p) => ({
+              ...p,
+              detected: p.detected + 1,
+              redactTotal: p.redactTotal + (event.signatures.length > 0 ? 1 : 0),
+              pageResults: [...p.pageResults, { page: event.page, signatures: event.signatures.length, seconds: event.timings ? seconds : undefined }],
+            }));
+          } else if (event.event === 'page' && event.stage === 'redact') {
+            const entities = Object.values(event.entities).reduce((a, b) => a + b, 0);
+            setProgress((p) => ({
+              ...p,
+              redacted: p.redacted + 1,
+              pageResults: p.pageResults.map((r) => (r.page === event.page ? { ...r, entities } : r)),
+            }));
+          } else if (event.event === 'result') {
+            result = event;
+          } else if (event.event === 'error') {
+            streamError = event.error;
+          }
+        });
+        if (result) {
+          // Revoke previous preview URL to prevent memory leaks
+          if (previewUrl) URL.revokeObjectURL(previewUrl);
+          setPreviewUrl(URL.createObjectURL(pdfBlob(result.pdf)));
+          fetchLogs();
+          setLatestLog({ ...result, privacy_mode: privacyMode });
+          setShowSuccessModal(true);
+        } else {
+          setError(streamError || 'Upload failed: incomplete response');
+        }
       } else {
         const errText = await response.text();
         try {
@@ -68,6 +115,7 @@ function App() {
     } catch (err) {
       setError('Network error: ' + err.message);
     }
+    setProgress(null);
     setLoading(false);
   };
   const handleReset = async () => {
@@ -90,7 +138,7 @@ function App() {
   };
   const fetchLogs = async () => {
     try {
-      const response = await fetch('http://localhost:5000/api/audit_log');
+      const response = await fetch('http://localhost:5000/api/audit_log?tail=200');
       const data = await response.json();
       setLogs(data);
     } catch (err) {
@@ -119,7 +167,7 @@ function App() {
       {loading && (
         <div style={{ position: 'fixed', top: 0, left: 0, width: '100%', height: '100%', background: 'rgba(255,255,255,0.8)', zIndex: 1000, display: 'flex', justifyContent: 'center', alignItems: 'center' }}>
           <ClipLoader color="#007BFF" size={60} />
-          <span style={{ marginLeft: '10px', fontSize: '1.2em' }}>Processing Document...</span>
+          <ProcessingProgress progress={progress} />
         </div>
       )}
       <ErrorMessage error={error} />
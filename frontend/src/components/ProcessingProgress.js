@@ -0,0 +1,31 @@
+import React from 'react';
+import { ProgressBar, ListGroup } from 'react-bootstrap';
+
+// Live view of /api/upload/stream events: pages analysed/redacted so far and what each page found
+const ProcessingProgress = ({ progress }) => {
+  if (!progress) return <span style={{ marginLeft: '10px', fontSize: '1.2em' }}>Processing Document...</span>;
+  const total = progress.scanned || progress.pages || 1;
+  const redacting = progress.redactTotal > 0 && progress.detected >= total;
+  const done = redacting ? progress.redacted : progress.detected;
+  const of = redacting ? progress.redactTotal : total;
+  return (
+    <div style={{ marginLeft: '10px', width: '420px' }}>
+      <div style={{ fontSize: '1.2em' }}>
+        {redacting ? 'Protecting' : 'Analysing'} page {Math.min(done + 1, of)} of {of}
+        {progress.skipped > 0 && ` (${progress.skipped} text-only pages skipped)`}
+      </div>
+      <ProgressBar now={(100 * done) / of} className="my-2" />
+      <ListGroup style={{ maxHeight: '200px', overflowY: 'auto' }}>
+        {progress.pageResults.slice().reverse().map((result) => (
+          <ListGroup.Item key={result.page}>
+            Page {result.page}: {result.signatures} signature{result.signatures === 1 ? '' : 's'}
+            {result.entities !== undefined && ` | Entities: ${result.entities}`}
+            {result.seconds !== undefined && ` | ${result.seconds.toFixed(2)}s`}
+          </ListGroup.Item>
+        ))}
+      </ListGroup>
+    </div>
+  );
+};
+
+export default ProcessingProgress;
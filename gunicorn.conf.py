@@ -0,0 +1,37 @@
+# gunicorn.conf.py - picked up automatically when gunicorn runs from the repo root
+import gc
+import os
+import sys
+
+# Import the app (and, with SIGSECURE_PRELOAD=1, load spaCy + Sentence-BERT) once in
+# the master; forked workers then share the model weights copy-on-write.
+preload_app = True
+os.environ.setdefault("SIGSECURE_PRELOAD", "1")
+# Inference threads per worker (torch and ONNX Runtime); SIGSECURE_TORCH_THREADS is the old name
+os.environ.setdefault("SIGSECURE_BERT_THREADS", os.environ.get("SIGSECURE_TORCH_THREADS", "1"))
+
+# Job state (/api/jobs) is per process: scale with threads before adding workers.
+# Model calls from all threads share one executor per model (models/inference.py), so
+# threads add concurrency without extra copies of torch. gevent workers are supported too.
+workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+
+
+def pre_fork(server, worker):
+    # Move everything loaded so far out of the GC's reach so collections in the
+    # workers do not touch (and copy) the shared pages
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    # Keep torch from spawning a thread per core in every worker process
+    threads = int(os.environ["SIGSECURE_BERT_THREADS"])
+    if threads and "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(threads)
+    # Fork the page process pool now, while this is the worker's only thread; created
+    # lazily from a request thread it would have to come from a fork server instead
+    parallel = sys.modules.get("models.parallel")
+    if parallel is not None:
+        parallel.start_pool()
@@ -0,0 +1,84 @@
+# scripts/benchmark_contour_merge.py
+# Times the contour-merge step of signature detection on synthetic dense pages
+# (thousands of small ink blobs, like a noisy scan) against the old cdist + greedy loop.
+import sys
+import time
+import argparse
+from pathlib import Path
+import cv2
+import numpy as np
+from scipy.spatial.distance import cdist
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / 'backend'))
+from models.signature_detect import contour_boxes, merge_boxes, filter_signature_boxes
+
+
+def synthetic_dense_page(n_blobs, width=1700, height=2200, seed=0):
+    """
+    Binary 200 DPI letter-size page with about n_blobs separate ink blobs (already dilated),
+    laid out on a jittered grid so they stay distinct contours, like characters on a dense scan.
+    """
+    rng = np.random.default_rng(seed)
+    page = np.zeros((height, width), dtype=np.uint8)
+    cell = max(8, int(np.sqrt(width * height / n_blobs)))
+    radius = max(2, int(cell * 0.3))
+    for cy in range(cell // 2, height - cell // 2, cell):
+        for cx in range(cell // 2, width - cell // 2, cell):
+            jx, jy = rng.integers(-cell // 10, cell // 10 + 1, 2)
+            rx, ry = rng.integers(max(1, radius // 2), radius + 1, 2)
+            cv2.ellipse(page, (int(cx + jx), int(cy + jy)), (int(rx), int(ry)), 0, 0, 360, 255, -1)
+    return page
+
+
+def legacy_merge(boxes):
+    # Previous implementation: full distance matrix + single-pass greedy grouping
+    boxes = [tuple(b) for b in boxes.tolist()]
+    centers = [(x + w/2, y + h/2) for x, y, w, h in boxes]
+    dists = cdist(centers, centers)
+    merged = []
+    visited = [False] * len(boxes)
+    for i in range(len(boxes)):
+        if not visited[i]:
+            group = [i]
+            for j in range(i+1, len(boxes)):
+                if dists[i][j] < 100:
+                    group.append(j)
+                    visited[j] = True
+            gx = min(boxes[k][0] for k in group)
+            gy = min(boxes[k][1] for k in group)
+            gw = max(boxes[k][0] + boxes[k][2] for k in group) - gx
+            gh = max(boxes[k][1] + boxes[k][3] for k in group) - gy
+            merged.append((gx, gy, gw, gh))
+    return merged
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark contour merging on synthetic dense pages")
+    parser.add_argument("--blobs", type=int, nargs="+", default=[500, 2000, 5000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--skip-legacy", action="store_true", help="Skip the quadratic baseline (slow for large pages)")
+    args = parser.parse_args()
+
+    print(f"{'blobs':>7} {'boxes':>7} {'legacy_s':>10} {'merge_s':>10} {'legacy_groups':>14} {'groups':>7} {'kept':>5} {'same':>5}")
+    for n_blobs in args.blobs:
+        page = synthetic_dense_page(n_blobs)
+        contours, _ = cv2.findContours(page, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        boxes = contour_boxes(contours, min_area=0)
+        merge_s, merged = best_of(lambda: merge_boxes(boxes), args.repeat)
+        kept = filter_signature_boxes(merged, page.shape[0])
+        if args.skip_legacy:
+            legacy_s, legacy_groups, same = float("nan"), "-", "-"
+        else:
+            legacy_s, legacy = best_of(lambda: legacy_merge(boxes), 1)
+            legacy_groups = len(legacy)
+            same = merged.tolist() == [list(box) for box in legacy]  # merge_boxes must keep the legacy groups
+        print(f"{n_blobs:>7} {len(boxes):>7} {legacy_s:>10.4f} {merge_s:>10.4f} {legacy_groups:>14} {len(merged):>7} {len(kept):>5} {str(same):>5}")
@@ -0,0 +1,258 @@
+# scripts/benchmark_pipeline.py
+# End-to-end and per-stage throughput benchmark on a generated, reproducible corpus.
+# Writes JSON (pages/sec, p50/p95 latency, peak RSS) that can be compared between commits:
+#   python benchmark_pipeline.py --out before.json
+#   python benchmark_pipeline.py --out after.json --compare before.json
+import io
+import sys
+import json
+import time
+import platform
+import resource
+import argparse
+import subprocess
+from pathlib import Path
+import cv2
+import fitz
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / 'backend'))
+from models.document_session import DocumentSession
+from models.signature_detect import detect_signatures, COARSE_DPI
+from models.text_source import words_for_signatures
+from models.text_pipeline import analyze_signature_texts, detect_and_redact_text_near_signatures
+from models.parallel import WORKERS
+from models import registry
+
+# Named corpora: documents x pages, signatures per page, noise (0-1), scanned pages, ID photos
+PROFILES = {
+    "digital": {"docs": 8, "pages": 2, "sigs_per_page": 1, "noise": 0.0, "scanned": False, "photos": False},
+    "noisy": {"docs": 8, "pages": 2, "sigs_per_page": 2, "noise": 0.3, "scanned": False, "photos": False},
+    "scanned": {"docs": 4, "pages": 2, "sigs_per_page": 1, "noise": 0.2, "scanned": True, "photos": False},
+    "medical": {"docs": 8, "pages": 3, "sigs_per_page": 1, "noise": 0.1, "scanned": False, "photos": True},
+    "long": {"docs": 2, "pages": 40, "sigs_per_page": 1, "noise": 0.1, "scanned": False, "photos": False},
+}
+NAMES = ["John Doe", "Jane Smith", "Maria Garcia", "Wei Chen", "Amit Patel", "Sara Jones"]
+STAGES = ["open", "detect", "words", "analyze", "redact"]
+
+
+def png_bytes(img):
+    ok, buf = cv2.imencode(".png", img)
+    return buf.tobytes()
+
+
+def synthetic_signature(rng, noise, width=600, height=200):
+    """Random cursive-like strokes on white, with optional Gaussian noise (noise 0-1)."""
+    img = np.full((height, width, 3), 255, np.uint8)
+    x = np.linspace(30, width - 30, 200)
+    for _ in range(rng.integers(2, 4)):
+        freq, phase, amp = rng.uniform(0.02, 0.08), rng.uniform(0, 6.3), rng.uniform(20, 60)
+        y = height / 2 + amp * np.sin(freq * x + phase) + rng.normal(0, 4, x.size).cumsum() * 0.3
+        pts = np.column_stack((x, np.clip(y, 10, height - 10))).astype(np.int32)
+        cv2.polylines(img, [pts], False, (90, 40, 20), thickness=int(rng.integers(3, 6)), lineType=cv2.LINE_AA)
+    if noise:
+        img = np.clip(img + rng.normal(0, 60 * noise, img.shape), 0, 255).astype(np.uint8)
+    return png_bytes(img)
+
+
+def synthetic_photo(rng, size=300):
+    # Near-square ID photo stand-in: smooth gradient with a face-like ellipse
+    yy, xx = np.mgrid[0:size, 0:size]
+    img = np.stack([(xx * 255 / size), (yy * 255 / size), np.full_like(xx, rng.integers(80, 200))], axis=-1).astype(np.uint8)
+    cv2.ellipse(img, (size // 2, size // 2), (size // 4, size // 3), 0, 0, 360, (60, 90, 150), -1)
+    return png_bytes(img)
+
+
+def make_document(profile, seed):
+    """One PDF (bytes) for a profile; same seed, same document."""
+    rng = np.random.default_rng(seed)
+    doc = fitz.open()
+    width, height = fitz.paper_size("letter")
+    for page_num in range(profile["pages"]):
+        page = doc.new_page(width=width, height=height)
+        page.insert_text((72, 72), f"Agreement {seed} - Page {page_num + 1}", fontsize=14)
+        for line in range(12):
+            page.insert_text((72, 110 + line * 14), f"Clause {line + 1}: the parties agree to the terms set out in schedule {line}.", fontsize=9)
+        slots = np.linspace(height * 0.45, height - 110, max(1, profile["sigs_per_page"]))
+        for k, y in enumerate(slots[:profile["sigs_per_page"]]):
+            role = "Witness" if k % 2 else ("Patient" if profile["photos"] else "Signer")
+            name = NAMES[int(rng.integers(len(NAMES)))]
+            page.insert_text((72, y - 8), f"{role}: {name}   Date: 2024-0{k % 9 + 1}-15   Place: London", fontsize=10)
+            sig_rect = fitz.Rect(72, y, 72 + rng.integers(170, 230), y + rng.integers(50, 70))
+            page.insert_image(sig_rect, stream=synthetic_signature(rng, profile["noise"]))
+            if profile["photos"] and k == 0:
+                page.insert_image(fitz.Rect(360, y - 20, 460, y + 80), stream=synthetic_photo(rng))
+        if profile["photos"]:
+            page.insert_text((72, height - 60), "Doctor: Dr. Jane Smith MD", fontsize=10)
+    if profile["scanned"]:
+        # Flatten every page to a noisy 200 DPI image: no text layer, OCR path
+        scanned = fitz.open()
+        for page in doc:
+            pix = page.get_pixmap(dpi=200, colorspace=fitz.csGRAY)
+            img = np.frombuffer(pix.samples, np.uint8).reshape(pix.height, pix.width)
+            if profile["noise"]:
+                img = np.clip(img + rng.normal(0, 40 * profile["noise"], img.shape), 0, 255).astype(np.uint8)
+            new_page = scanned.new_page(width=page.rect.width, height=page.rect.height)
+            new_page.insert_image(new_page.rect, stream=png_bytes(img))
+        doc = scanned
+    return doc.tobytes(garbage=1)
+
+
+def percentile(values, q):
+    return round(float(np.percentile(values, q)), 4) if values else None
+
+
+def peak_rss_mb():
+    # ru_maxrss is KB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_document(data, workers, privacy_mode):
+    """Times one document stage by stage, then end to end. Returns (stage seconds, e2e seconds, peak bytes)."""
+    times = {}
+    start = time.perf_counter()
+    session = DocumentSession(data)
+    times["open"] = time.perf_counter() - start
+    try:
+        start = time.perf_counter()
+        signatures = detect_signatures(session, workers)
+        times["detect"] = time.perf_counter() - start
+        start = time.perf_counter()
+        sig_words = words_for_signatures(session, signatures, expand=200)
+        times["words"] = time.perf_counter() - start
+        start = time.perf_counter()
+        analyses = analyze_signature_texts([words for _, words, _ in sig_words], privacy_mode)
+        times["analyze"] = time.perf_counter() - start
+        start = time.perf_counter()
+        detect_and_redact_text_near_signatures(session, signatures, io.BytesIO(), privacy_mode, analyses=analyses)
+        times["redact"] = time.perf_counter() - start
+        peak_bytes = session.peak_bytes
+    finally:
+        session.close()
+    # End to end as the API runs it: fresh session, detection, then redaction with analysis
+    start = time.perf_counter()
+    with DocumentSession(data) as session:
+        signatures = detect_signatures(session, workers)
+        detect_and_redact_text_near_signatures(session, signatures, io.BytesIO(), privacy_mode, workers=workers)
+    return times, time.perf_counter() - start, peak_bytes
+
+
+def run_profile(name, profile, repeat, workers, seed):
+    privacy_mode = "medical" if profile["photos"] else "signer"
+    corpus = [make_document(profile, seed + i) for i in range(profile["docs"])]
+    run_document(corpus[0], workers, privacy_mode)  # Warm-up: first-use costs are not throughput
+    stage_times = {stage: [] for stage in STAGES}
+    e2e = []
+    peaks = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for data in corpus:
+            times, seconds, peak_bytes = run_document(data, workers, privacy_mode)
+            for stage in STAGES:
+                stage_times[stage].append(times[stage])
+            e2e.append(seconds)
+            peaks.append(peak_bytes)
+    pages = profile["pages"] * len(corpus) * repeat
+    e2e_total = sum(e2e)
+    return {
+        "profile": profile,
+        "documents": len(corpus) * repeat,
+        "pages": pages,
+        "pages_per_sec": round(pages / e2e_total, 3) if e2e_total else None,
+        "latency_s": {"p50": percentile(e2e, 50), "p95": percentile(e2e, 95), "mean": round(float(np.mean(e2e)), 4)},
+        "stages_s": {
+            stage: {"p50": percentile(values, 50), "p95": percentile(values, 95), "total": round(sum(values), 4)}
+            for stage, values in stage_times.items()
+        },
+        "peak_page_memory_mb": round(max(peaks) / (1024 * 1024), 2),
+        "peak_rss_mb": peak_rss_mb(),  # Process-wide high-water mark so far
+        "wall_s": round(time.perf_counter() - start, 3),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=Path(__file__).parent, text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(current, baseline, tolerance):
+    """Prints per-profile changes; returns the profiles that regressed by more than tolerance."""
+    regressions = []
+    print(f"{'profile':<10} {'pages/s':>10} {'base':>10} {'change':>8} {'p95_s':>8} {'base':>8}")
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if not base or not base["pages_per_sec"]:
+            continue
+        change = result["pages_per_sec"] / base["pages_per_sec"] - 1
+        print(f"{name:<10} {result['pages_per_sec']:>10.3f} {base['pages_per_sec']:>10.3f} {change:>+8.1%} "
+              f"{result['latency_s']['p95']:>8.3f} {base['latency_s']['p95']:>8.3f}")
+        if change < -tolerance or result["latency_s"]["p95"] > base["latency_s"]["p95"] * (1 + tolerance):
+            regressions.append(name)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark detection + redaction on a synthetic corpus")
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES), choices=list(PROFILES) + ["custom"])
+    parser.add_argument("--repeat", type=int, default=2, help="Passes over each corpus")
+    parser.add_argument("--workers", type=int, default=None, help="Page pool size (default SIGSECURE_WORKERS)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Write results JSON here (default: stdout)")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed slowdown before --compare fails")
+    parser.add_argument("--save-corpus", help="Also write the generated PDFs to this directory")
+    # Parameters of the "custom" profile
+    parser.add_argument("--docs", type=int, default=4)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--sigs-per-page", type=int, default=1)
+    parser.add_argument("--noise", type=float, default=0.0)
+    parser.add_argument("--scanned", action="store_true")
+    parser.add_argument("--photos", action="store_true")
+    args = parser.parse_args()
+
+    profiles = dict(PROFILES)
+    profiles["custom"] = {"docs": args.docs, "pages": args.pages, "sigs_per_page": args.sigs_per_page,
+                          "noise": args.noise, "scanned": args.scanned, "photos": args.photos}
+    if args.save_corpus:
+        out_dir = Path(args.save_corpus)
+        out_dir.mkdir(parents=True, exist_ok=True)
+        for name in args.profiles:
+            for i in range(profiles[name]["docs"]):
+                (out_dir / f"{name}_{i}.pdf").write_bytes(make_document(profiles[name], args.seed + i))
+
+    registry.warm_up()
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pymupdf": fitz.VersionBind,
+            "machine": platform.machine(),
+            "cpus": WORKERS,
+            "workers": args.workers,
+            "coarse_dpi": COARSE_DPI,
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "model_load_s": dict(registry.load_seconds),
+        },
+        "results": {},
+    }
+    for name in args.profiles:
+        report["results"][name] = run_profile(name, profiles[name], args.repeat, args.workers, args.seed)
+        result = report["results"][name]
+        print(f"{name}: {result['pages_per_sec']} pages/s, p50 {result['latency_s']['p50']}s, "
+              f"p95 {result['latency_s']['p95']}s, peak RSS {result['peak_rss_mb']} MB", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        Path(args.out).write_text(output)
+    else:
+        print(output)
+    if args.compare:
+        regressions = compare(report, json.loads(Path(args.compare).read_text()), args.tolerance)
+        if regressions:
+            print(f"Regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
@@ -0,0 +1,277 @@
+# scripts/bulk_redact.py
+# Offline detection + redaction for whole directories (archive backfills), without the API:
+#   python bulk_redact.py archive/ --out redacted/ --privacy-mode signer
+#   python bulk_redact.py --manifest files.txt --out redacted/ --processes 8
+# Documents are spread over a process pool; each worker has the models loaded once.
+# <out>/audit.jsonl gets one audit entry per document (same fields as the API's audit log)
+# and doubles as the checkpoint: a rerun skips every file already written successfully,
+# so an interrupted backfill resumes where it stopped. One output directory holds one
+# set of redaction settings.
+import gc
+import os
+import sys
+import json
+import time
+import datetime
+import argparse
+import traceback
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+# One inference thread per worker process; documents, not threads, give the parallelism
+os.environ.setdefault("SIGSECURE_BERT_THREADS", "1")
+import cv2
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / 'backend'))
+from models.document_session import DocumentSession
+from models.pipeline import analyze_document
+from models.text_pipeline import detect_and_redact_text_near_signatures
+from models.page_filter import screening_report
+from models import registry, metrics
+from models.parallel import pool_context
+
+AUDIT_FILE = "audit.jsonl"
+REPORT_FILE = "report.json"
+PROGRESS_INTERVAL = 10.0  # Seconds between progress lines
+NO_ENTITIES = {"PERSON": 0, "DATE": 0, "GPE": 0}
+
+
+def find_inputs(directory):
+    """PDFs under directory (recursive), as (path, path relative to directory), sorted."""
+    root = Path(directory)
+    return [(path, path.relative_to(root)) for path in sorted(root.rglob("*")) if path.is_file() and path.suffix.lower() == ".pdf"]
+
+
+def read_manifest(manifest):
+    """
+    One PDF path per line (blank lines and # comments ignored); relative paths are
+    resolved against the manifest's directory. Outputs keep the listed layout (absolute
+    paths are mirrored from the filesystem root).
+    """
+    manifest = Path(manifest)
+    inputs = []
+    for line in manifest.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        path = Path(line)
+        if path.is_absolute():
+            inputs.append((path, path.relative_to(path.anchor)))
+        else:
+            inputs.append((manifest.parent / path, path))
+    return inputs
+
+
+def output_path(out_dir, relative, highlight_only):
+    prefix = "highlighted" if highlight_only else "redacted"
+    return out_dir / relative.parent / f"{prefix}_{relative.name}"
+
+
+def load_checkpoint(audit_path, settings):
+    """
+    Relative paths (str) whose last audit entry succeeded and whose output still exists.
+    Raises ValueError if the directory was written with other settings (outputs would mix).
+    """
+    done = {}
+    if not audit_path.exists():
+        return set()
+    with open(audit_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # Line cut short by an interruption
+            if any(entry.get(key) != value for key, value in settings.items()):
+                raise ValueError(f"{audit_path.parent} holds output with other settings ({entry['file']}); use a new --out")
+            done[entry["file"]] = entry.get("error") is None and entry.get("output") and Path(entry["output"]).exists()
+    return {name for name, ok in done.items() if ok}
+
+
+def init_worker():
+    # Document-level parallelism: keep OpenCV to one thread per process. The models are
+    # usually inherited from the parent (fork); otherwise they load here, once per worker.
+    cv2.setNumThreads(1)
+    registry.warm_up()
+
+
+def process_document(path, relative, output, settings):
+    """Runs detection + redaction for one PDF. Returns its audit entry (never raises)."""
+    start = time.perf_counter()
+    trace, token = metrics.start_trace()
+    partial = output.with_name(f".{output.name}.{os.getpid()}.tmp")
+    entry = {
+        "timestamp": None,
+        "file": str(relative),
+        "output": None,
+        **settings,
+        "pages": 0,
+        "signatures_detected": 0,
+        "entities_redacted": dict(NO_ENTITIES),
+    }
+    try:
+        output.parent.mkdir(parents=True, exist_ok=True)
+        with DocumentSession(path) as session:
+            entry["pages"] = len(session)
+            # workers=1: pool workers cannot fork page pools of their own
+            signatures, analyses = analyze_document(session, workers=1, privacy_mode=settings["privacy_mode"])
+            entry["signatures_detected"] = len(signatures)
+            _, entry["entities_redacted"] = detect_and_redact_text_near_signatures(
+                session,
+                signatures,
+                partial,
+                settings["privacy_mode"],
+                settings["redaction_style"],
+                settings["highlight_only"],
+                analyses=analyses,
+                workers=1,
+            )
+            entry["peak_memory_mb"] = round(session.peak_bytes / (1024 * 1024), 1) if session.peak_bytes else None
+            entry["page_screen"] = screening_report(session)
+        os.replace(partial, output)  # Only complete outputs ever carry the final name
+        entry["output"] = str(output)
+        entry["error"] = None
+    except Exception as e:
+        if partial.exists():
+            partial.unlink()
+        entry["error"] = f"{str(e)}\n{traceback.format_exc()}"
+    finally:
+        metrics.end_trace(token)
+    entry["timestamp"] = datetime.datetime.now().isoformat()
+    entry["timings"] = trace.summary()
+    entry["seconds"] = round(time.perf_counter() - start, 3)
+    return entry
+
+
+class Progress:
+    """Running totals for the throughput report."""
+
+    def __init__(self, total, skipped):
+        self.total = total
+        self.skipped = skipped
+        self.start = time.perf_counter()
+        self.last_print = self.start
+        self.done = 0
+        self.failed = 0
+        self.pages = 0
+        self.signatures = 0
+        self.latencies = []
+
+    def add(self, entry):
+        if entry["error"] is None:
+            self.done += 1
+        else:
+            self.failed += 1
+        self.pages += entry["pages"]
+        self.signatures += entry["signatures_detected"]
+        self.latencies.append(entry["seconds"])
+
+    def report(self):
+        elapsed = time.perf_counter() - self.start
+        finished = self.done + self.failed
+        return {
+            "files": self.total,
+            "skipped": self.skipped,
+            "processed": self.done,
+            "failed": self.failed,
+            "pages": self.pages,
+            "signatures_detected": self.signatures,
+            "wall_s": round(elapsed, 3),
+            "docs_per_sec": round(finished / elapsed, 3) if elapsed else None,
+            "pages_per_sec": round(self.pages / elapsed, 3) if elapsed else None,
+            "latency_s": {
+                "p50": round(float(np.percentile(self.latencies, 50)), 3) if self.latencies else None,
+                "p95": round(float(np.percentile(self.latencies, 95)), 3) if self.latencies else None,
+            },
+        }
+
+    def maybe_print(self, force=False):
+        now = time.perf_counter()
+        if not force and now - self.last_print < PROGRESS_INTERVAL:
+            return
+        self.last_print = now
+        report = self.report()
+        finished = self.done + self.failed
+        remaining = self.total - self.skipped - finished
+        eta = remaining / report["docs_per_sec"] if report["docs_per_sec"] else None
+        print(f"{finished}/{self.total - self.skipped} documents ({self.failed} failed), "
+              f"{report['docs_per_sec']} docs/s, {report['pages_per_sec']} pages/s"
+              + (f", ETA {eta:.0f}s" if eta is not None else ""), file=sys.stderr, flush=True)
+
+
+def run(inputs, out_dir, settings, processes):
+    out_dir.mkdir(parents=True, exist_ok=True)
+    audit_path = out_dir / AUDIT_FILE
+    finished = load_checkpoint(audit_path, settings)
+    todo = [(path, relative) for path, relative in inputs if str(relative) not in finished]
+    progress = Progress(len(inputs), len(inputs) - len(todo))
+    print(f"{len(inputs)} PDFs, {progress.skipped} already done, {len(todo)} to process on {processes} processes", file=sys.stderr)
+    if not todo:
+        return progress.report()
+
+    # Load the models before forking so workers share them copy-on-write (as gunicorn
+    # preload does), and keep the GC from touching those shared pages in the workers.
+    # Warm-up starts no threads, so the pool forks; should a thread be running anyway,
+    # pool_context falls back to a fork server rather than fork a threaded process.
+    registry.warm_up()
+    gc.freeze()
+    ctx = pool_context()
+    with open(audit_path, "a", encoding="utf-8") as audit, \
+            ProcessPoolExecutor(max_workers=processes, mp_context=ctx, initializer=init_worker) as pool:
+        pending = set()
+        queued = iter(todo)
+        try:
+            while True:
+                # A bounded window of submitted documents keeps memory flat for huge archives
+                for path, relative in queued:
+                    output = output_path(out_dir, relative, settings["highlight_only"])
+                    pending.add(pool.submit(process_document, path, relative, output, settings))
+                    if len(pending) >= processes * 2:
+                        break
+                if not pending:
+                    break
+                completed, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in completed:
+                    entry = future.result()
+                    # Written as each document finishes, so an interrupted run resumes from here
+                    audit.write(json.dumps(entry) + "\n")
+                    audit.flush()
+                    os.fsync(audit.fileno())
+                    progress.add(entry)
+                    if entry["error"] is not None:
+                        print(f"Failed: {entry['file']}: {entry['error'].splitlines()[0]}", file=sys.stderr)
+                progress.maybe_print()
+        except KeyboardInterrupt:
+            for future in pending:
+                future.cancel()
+            print("Interrupted; rerun the same command to resume", file=sys.stderr)
+            raise
+    progress.maybe_print(force=True)
+    return progress.report()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Detect and redact signatures in every PDF of a directory or manifest")
+    parser.add_argument("input", nargs="?", help="Directory to walk for PDFs (recursive)")
+    parser.add_argument("--manifest", help="Text file listing PDF paths, one per line (instead of a directory)")
+    parser.add_argument("--out", required=True, help="Output directory (mirrors the input layout; holds audit.jsonl)")
+    parser.add_argument("--privacy-mode", default="none", choices=["none", "signer", "witness", "medical"])
+    parser.add_argument("--redaction-style", default="black", choices=["black", "blur", "watermark"])
+    parser.add_argument("--highlight-only", action="store_true", help="Outline instead of redacting")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="Documents processed at once")
+    args = parser.parse_args()
+
+    if bool(args.input) == bool(args.manifest):
+        parser.error("give either an input directory or --manifest")
+    inputs = read_manifest(args.manifest) if args.manifest else find_inputs(args.input)
+    settings = {"privacy_mode": args.privacy_mode, "redaction_style": args.redaction_style, "highlight_only": args.highlight_only}
+    out_dir = Path(args.out)
+    try:
+        report = run(inputs, out_dir, settings, max(1, args.processes))
+    except ValueError as e:
+        parser.error(str(e))
+    except KeyboardInterrupt:
+        sys.exit(130)
+    (out_dir / REPORT_FILE).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if report["failed"] else 0)
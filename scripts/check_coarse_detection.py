@@ -0,0 +1,74 @@
+# scripts/check_coarse_detection.py
+# Checks that coarse-to-fine signature detection finds the same signatures as the
+# full-page fine pass (SIGSECURE_COARSE_DPI=0), on the benchmark corpora plus pages of
+# thin, light strokes (the ink a low-DPI render washes out first):
+#   python check_coarse_detection.py
+#   SIGSECURE_COARSE_DPI=40 python check_coarse_detection.py --profiles digital scanned
+# Exits 1 when any page's detections differ.
+import sys
+import time
+import argparse
+from pathlib import Path
+import fitz
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / 'backend'))
+sys.path.append(str(Path(__file__).resolve().parent))
+from benchmark_pipeline import PROFILES, make_document
+from models import signature_detect
+from models.document_session import DocumentSession
+
+# Stroke widths (points) and gray levels (0 black - 1 white) of the thin-stroke pages
+STROKE_WIDTHS = (0.2, 0.3, 0.5, 1.0)
+STROKE_GRAYS = (0.2, 0.35, 0.45, 0.55)
+
+
+def thin_stroke_document(width, gray):
+    """One page with a "Signature:" line and a signature-sized scribble in the given stroke."""
+    doc = fitz.open()
+    page = doc.new_page(width=612, height=792)
+    page.insert_text((72, 300), "Signature:", fontsize=11)
+    xs = np.linspace(150, 350, 120)
+    ys = 295 + 12 * np.sin(xs / 9) + 6 * np.sin(xs / 3.7)
+    shape = page.new_shape()
+    shape.draw_polyline(list(zip(xs.tolist(), ys.tolist())))
+    shape.draw_bezier((160, 310), (220, 270), (260, 330), (330, 285))
+    shape.finish(color=(gray, gray, gray), width=width)
+    shape.commit()
+    return doc.tobytes()
+
+
+def detections(data, coarse_dpi):
+    # Detection per page, rounded to whole points; page pre-filter as in production
+    signature_detect.COARSE_DPI = coarse_dpi
+    start = time.perf_counter()
+    signatures = signature_detect.detect_signatures(data, workers=1)
+    seconds = time.perf_counter() - start
+    found = sorted((int(s["page"]), tuple(np.round(s["bbox"]).astype(int).tolist()), str(s["type"])) for s in signatures)
+    return found, seconds
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare coarse-to-fine detection with the full-page fine pass")
+    parser.add_argument("--profiles", nargs="+", default=list(PROFILES), choices=list(PROFILES))
+    args = parser.parse_args()
+
+    coarse_dpi = signature_detect.COARSE_DPI or 50
+    cases = [(f"{name}_{i}", make_document(PROFILES[name], i)) for name in args.profiles for i in range(PROFILES[name]["docs"])]
+    cases += [(f"thin_{w:g}pt_gray{g:g}", thin_stroke_document(w, g)) for w in STROKE_WIDTHS for g in STROKE_GRAYS]
+
+    differ = []
+    totals = [0.0, 0.0]
+    for name, data in cases:
+        full, full_s = detections(data, 0)
+        coarse, coarse_s = detections(data, coarse_dpi)
+        totals[0] += full_s
+        totals[1] += coarse_s
+        if full != coarse:
+            differ.append(name)
+            print(f"{name}: full pass {len(full)} signatures, coarse {len(coarse)}")
+            print(f"  only full:   {sorted(set(full) - set(coarse))}")
+            print(f"  only coarse: {sorted(set(coarse) - set(full))}")
+    print(f"{len(cases)} documents, {len(differ)} differ; detection {totals[0]:.2f}s full pass, "
+          f"{totals[1]:.2f}s coarse at {coarse_dpi} DPI")
+    sys.exit(1 if differ else 0)
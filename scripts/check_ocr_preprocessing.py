@@ -0,0 +1,125 @@
+# scripts/check_ocr_preprocessing.py
+# Compares the adaptive OCR preprocessing (SIGSECURE_OCR_ADAPTIVE=1) against the default
+# contrast boost + blur retry, on the OCR clips the pipeline would read:
+#   python check_ocr_preprocessing.py                    # generate_noisy_test_pdf output, clean + scanned
+#   python check_ocr_preprocessing.py scans/a.pdf scans/b.pdf --noise 0
+# Each PDF is also rebuilt as image-only "scans" with added noise and reduced contrast
+# (--noise, --contrast). Reports mean confidence, word counts, Tesseract passes and time
+# per document for both paths; exits 1 when the adaptive path loses confidence or words.
+import sys
+import json
+import time
+import argparse
+import tempfile
+from pathlib import Path
+import fitz
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / 'backend'))
+sys.path.append(str(Path(__file__).resolve().parent))
+from generate_noisy_test_pdf import generate_noisy_test_pdf
+from models import metrics
+from models.document_session import DocumentSession
+from models.signature_detect import detect_signatures
+from models.records import expand_boxes
+from models.text_source import ocr_words
+
+SCAN_DPI = 200
+
+
+def scanned_copy(source, output, noise, contrast, seed=0):
+    """Image-only copy of source: every page rendered, grey levels squeezed and noise added."""
+    rng = np.random.default_rng(seed)
+    with fitz.open(source) as doc, fitz.open() as scan:
+        for page in doc:
+            pix = page.get_pixmap(dpi=SCAN_DPI, colorspace=fitz.csGRAY, alpha=False)
+            gray = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width).astype(np.float32)
+            # Paper stays near white, ink is lifted towards grey
+            gray = 255 - (255 - gray) * contrast + rng.normal(0, noise, gray.shape)
+            gray = np.clip(gray, 0, 255).astype(np.uint8)
+            image = fitz.Pixmap(fitz.csGRAY, pix.width, pix.height, gray.tobytes(), False)
+            scan.new_page(width=page.rect.width, height=page.rect.height).insert_image(page.rect, pixmap=image)
+        scan.save(output)
+    return output
+
+
+def ocr_clips(session):
+    """(page_num, rect) for each signature's expanded clip; the whole page when a page has none."""
+    signatures = detect_signatures(session)
+    clips = []
+    for page_num in range(len(session)):
+        boxes = signatures['bbox'][signatures['page'] == page_num + 1]
+        if len(boxes):
+            clips += [(page_num, fitz.Rect(box.tolist())) for box in expand_boxes(boxes, 200)]
+        else:
+            clips.append((page_num, session.page(page_num).rect))
+    return clips
+
+
+def run_path(path, clips, adaptive):
+    trace, token = metrics.start_trace()
+    start = time.perf_counter()
+    confidences, words = [], 0
+    try:
+        with DocumentSession(path) as session:
+            for page_num, rect in clips:
+                result = ocr_words(session, page_num, rect & session.page(page_num).rect, adaptive=adaptive)
+                words += len(result.text)
+                confidences.append(result.mean_confidence())
+    finally:
+        metrics.end_trace(token)
+    passes = sum(1 for stage, _, _ in trace.spans if stage in ("ocr", "ocr_retry"))
+    return {
+        "mean_confidence": round(float(np.mean(confidences)), 2) if confidences else 0.0,
+        "words": words,
+        "passes": passes,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def check(path):
+    with DocumentSession(path) as session:
+        clips = ocr_clips(session)
+    default = run_path(path, clips, adaptive=False)
+    adaptive = run_path(path, clips, adaptive=True)
+    return {"file": Path(path).name, "clips": len(clips), "default": default, "adaptive": adaptive}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare adaptive OCR preprocessing against the default path")
+    parser.add_argument("pdfs", nargs="*", help="PDFs to check (default: generate_noisy_test_pdf output)")
+    parser.add_argument("--noise", type=float, nargs="*", default=[0.0, 12.0, 25.0], help="Noise levels (grey-level std) of the scanned copies")
+    parser.add_argument("--contrast", type=float, default=0.6, help="Ink contrast kept in the noisy scanned copies (1.0 = unchanged)")
+    parser.add_argument("--max-confidence-loss", type=float, default=0.0, help="Allowed drop in mean confidence (points)")
+    parser.add_argument("--max-word-loss", type=float, default=0.0, help="Allowed drop in recognized words (fraction)")
+    parser.add_argument("--out", help="Write the JSON report here as well")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        sources = [Path(p) for p in args.pdfs]
+        if not sources:
+            data = Path(__file__).resolve().parent.parent / 'data'
+            signature = data / 'signature.png'
+            sources = [Path(tmp) / 'noisy_test.pdf']
+            generate_noisy_test_pdf(sources[0], signature if signature.exists() else None)
+        inputs = list(sources)
+        for source in sources:
+            for noise in args.noise:
+                contrast = args.contrast if noise else 1.0
+                inputs.append(scanned_copy(source, Path(tmp) / f"{source.stem}_scan_n{noise:g}.pdf", noise, contrast))
+        results = [check(path) for path in inputs]
+
+    failed = False
+    print(f"{'file':32} {'clips':>5} {'conf':>13} {'words':>11} {'passes':>9} {'seconds':>15}")
+    for r in results:
+        d, a = r["default"], r["adaptive"]
+        lost = (a["mean_confidence"] < d["mean_confidence"] - args.max_confidence_loss
+                or a["words"] < d["words"] * (1 - args.max_word_loss))
+        failed |= lost
+        print(f"{r['file']:32} {r['clips']:>5} {d['mean_confidence']:>6} {a['mean_confidence']:>6} "
+              f"{d['words']:>5} {a['words']:>5} {d['passes']:>4} {a['passes']:>4} "
+              f"{d['seconds']:>7} {a['seconds']:>7}" + ("  WORSE" if lost else ""))
+    print("(each pair: default, adaptive)")
+    if args.out:
+        Path(args.out).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,123 @@
+# scripts/check_semantic_backend.py
+# Compares a semantic filter inference backend (int8, onnx) against the fp32 torch model
+# on a labeled sample, so a cheaper backend does not silently change what gets redacted:
+#   python check_semantic_backend.py --backend int8
+#   SIGSECURE_BERT_ONNX_FILE=onnx/model_quint8_avx2.onnx python check_semantic_backend.py --backend onnx
+# Exits 1 when keep/drop decisions disagree more than allowed or similarities drift too far.
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / 'backend'))
+from models import registry
+from models.semantic import anchors_for, normalize_sentence, SIMILARITY_THRESHOLD
+
+# Sentences from around signature blocks; label 1 = the filter should keep it for NER
+SAMPLE = [
+    ("Signed by John Doe on behalf of the company.", 1),
+    ("Signer name: Jane Smith", 1),
+    ("Name of signatory: Maria Garcia", 1),
+    ("Witness: Wei Chen", 1),
+    ("Signature of the patient or legal guardian", 1),
+    ("Patient name: Amit Patel, date of birth 04/12/1980", 1),
+    ("Printed name of authorized representative", 1),
+    ("I, Sara Jones, agree to the terms above.", 1),
+    ("Executed by the undersigned on the date written below.", 1),
+    ("Full legal name of the person signing", 1),
+    ("Countersigned by the notary public", 1),
+    ("Name and title of the signing officer", 1),
+    ("Payment is due within thirty days of the invoice date.", 0),
+    ("The quarterly report is attached for your review.", 0),
+    ("Page 2 of 5", 0),
+    ("Total amount: $1,250.00", 0),
+    ("This agreement is governed by the laws of the State of New York.", 0),
+    ("Please return the completed form to the front desk.", 0),
+    ("Dosage: 20 mg twice daily with food.", 0),
+    ("Section 4.2 Termination for convenience", 0),
+    ("The equipment must be inspected annually.", 0),
+    ("Office hours are 9am to 5pm, Monday through Friday.", 0),
+    ("Shipping address and billing address may differ.", 0),
+    ("Confidential - do not distribute", 0),
+]
+
+
+def load_sample(path):
+    # JSON lines: {"sentence": "...", "label": 0 or 1}
+    with open(path) as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [(row["sentence"], int(row["label"])) for row in rows]
+
+
+def similarities(model, sentences, anchors, repeat):
+    """(best anchor similarity per sentence, sentences/sec over repeat passes)."""
+    anchor_vectors = model.encode(anchors, normalize_embeddings=True)
+    texts = [normalize_sentence(s) for s in sentences]
+    model.encode(texts[:2], normalize_embeddings=True)  # Exclude one-off initialisation
+    start = time.perf_counter()
+    for _ in range(repeat):
+        vectors = model.encode(texts, batch_size=64, normalize_embeddings=True)
+    elapsed = time.perf_counter() - start
+    return (np.asarray(vectors) @ np.asarray(anchor_vectors).T).max(axis=1), len(texts) * repeat / elapsed
+
+
+def label_scores(keep, labels):
+    tp = int(np.sum(keep & (labels == 1)))
+    precision = tp / max(int(keep.sum()), 1)
+    recall = tp / max(int((labels == 1).sum()), 1)
+    return round(precision, 4), round(recall, 4)
+
+
+def check(backend, sample, privacy_mode, threads, repeat):
+    sentences = [sentence for sentence, _ in sample]
+    labels = np.array([label for _, label in sample])
+    anchors = anchors_for(privacy_mode)
+    report = {"model": registry.BERT_MODEL, "privacy_mode": privacy_mode, "anchors": anchors,
+              "threshold": SIMILARITY_THRESHOLD, "sentences": len(sentences), "backends": {}}
+    results = {}
+    for name in ("torch", backend):
+        model = registry.load_bert_model(name, threads)
+        sims, rate = similarities(model, sentences, anchors, repeat)
+        keep = sims > SIMILARITY_THRESHOLD
+        precision, recall = label_scores(keep, labels)
+        results[name] = (sims, keep)
+        report["backends"][name] = {"sentences_per_sec": round(rate, 1), "precision": precision, "recall": recall}
+        del model
+    ref_sims, ref_keep = results["torch"]
+    sims, keep = results[backend]
+    delta = np.abs(sims - ref_sims)
+    report["comparison"] = {
+        "decision_agreement": round(float(np.mean(keep == ref_keep)), 4),
+        "max_similarity_delta": round(float(delta.max()), 4),
+        "mean_similarity_delta": round(float(delta.mean()), 4),
+        "speedup": round(report["backends"][backend]["sentences_per_sec"] / report["backends"]["torch"]["sentences_per_sec"], 2),
+        "changed": [
+            {"sentence": sentences[i], "torch": round(float(ref_sims[i]), 4), backend: round(float(sims[i]), 4)}
+            for i in np.flatnonzero(keep != ref_keep)
+        ],
+    }
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check a semantic filter backend against the fp32 torch model")
+    parser.add_argument("--backend", default=registry.BERT_BACKEND, choices=registry.BERT_BACKENDS)
+    parser.add_argument("--sample", help="Labeled JSON lines ({\"sentence\", \"label\"}); default: built-in sample")
+    parser.add_argument("--privacy-mode", default="none", help="Selects the anchor phrases (SIGSECURE_ANCHORS)")
+    parser.add_argument("--threads", type=int, default=registry.BERT_THREADS, help="Intra-op threads (0: library default)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed encode passes per backend")
+    parser.add_argument("--min-agreement", type=float, default=1.0, help="Required share of identical keep/drop decisions")
+    parser.add_argument("--max-delta", type=float, default=0.05, help="Largest allowed similarity difference")
+    args = parser.parse_args()
+
+    sample = load_sample(args.sample) if args.sample else SAMPLE
+    report = check(args.backend, sample, args.privacy_mode, args.threads, args.repeat)
+    print(json.dumps(report, indent=2))
+    comparison = report["comparison"]
+    if comparison["decision_agreement"] < args.min_agreement or comparison["max_similarity_delta"] > args.max_delta:
+        print(f"FAIL: {args.backend} diverges from torch (agreement {comparison['decision_agreement']}, "
+              f"max delta {comparison['max_similarity_delta']})")
+        sys.exit(1)
+    print(f"OK: {args.backend} matches torch on {len(sample)} sentences")